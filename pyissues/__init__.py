@@ -1,4 +1,57 @@
-from . import base
-from . import io
-from . import network
-from .version import __version__
\ No newline at end of file
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+import types
+
+from .version import __version__
+
+# Submodules are imported on first access, so that importing the package does
+# not import the network stack
+_SUBMODULES = {
+    'base', 'cache', 'cli', 'const', 'daemon', 'io', 'job', 'meta', 'network',
+    'query', 'search', 'stats', 'util'
+}
+
+
+def lazy_import(name: str, package: str | None = __name__) -> types.ModuleType:
+    """Module imported on first attribute access
+
+    The modules of the command line and of the daemon are declared with this
+    function at the top of the module, so that a sub-command only imports the
+    modules it uses.
+
+    Parameters:
+
+    - `name`: `str`, the module, relative to `package` if it starts with a dot
+    - `package`: `str` or `None`, the package relative names are resolved in
+
+    Returns: `types.ModuleType`, the module, already imported if it is
+    """
+    name = importlib.util.resolve_name(name, package)
+    try:
+        return sys.modules[name]
+    except KeyError:
+        pass
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError("No module named '%s'" % (name, ), name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError(
+        "module '%s' has no attribute '%s'" % (__name__, name)
+    )
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES)
@@ -7,23 +7,75 @@ python -m pyissues [SUB-COMMAND] [ARGS]
 Available sub-commands:
 
 * check     Check whether the issue list is updatable
+* compact   Fold the delta log of the issue list into the issue list
+* convert   Convert the issue list to the format of the output location, or
+            upgrade it to the current format version in place
 * fix       Fix the missing issue in the list
 * load      Load all of the issues into the memory
+* query     List the issues matching conditions on their fields
 * rebuild   Refetch the metadata and all of the issues
 * refetch   Refetch all of the issues using the metadata
+* reparse   Rebuild the issue list from the page cache without fetching
+* search    Search the titles and messages of the issues
+* serve     Keep the issues in memory and serve `show`, `load`, `query` and
+            `search` over a local socket
 * show      Display the specified issue
+* stats     Count the created, open and closed issues by period and category
 * update    Update the metadata and issue list
 * version   Display the version
 
 Available arguments:
 
---fullupdate, -fu   Refetch and update all of the open issues
-    --threads, -t   Number of threads to be used
+--fullupdate, -fu   Refetch and update all of the open issues, not only the
+                    ones with new activity
+     --resume, -r   Resume the interrupted fetching job
+    --threads, -t   Number of threads (or requests in flight) to be used
+     --engine, -e   Fetch with a process pool (`process`), the `async` engine,
+                    or a `pipeline` of downloading threads and parsing
+                    processes
+     --io-workers   Number of downloading threads of the pipeline
+    --cpu-workers   Number of parsing processes of the pipeline
+         --parser   Parse the pages with `bs4` or `lxml`, the environment
+                    variable `PYISSUES_PARSER` by default
+      --cache, -c   Specify the directory of the page cache, empty to disable
        --meta, -m   Specify the location of metadata file
        --data, -d   Specify the location of data file
+     --output, -o   Specify the location of converted data file
       --issue, -i   Specify the issue to be displayed
+      --query, -q   Specify the text to be searched, or the conditions of
+                    `query`, such as `status=open component=Documentation
+                    created>=2020`, see `pyissues.query`
+      --limit, -l   Specify the maximum number of results to be displayed
+       --unit, -u   Specify the period of `stats`, one of year, month, day,
+                    hour, minute and second
+         --by, -b   Specify the categorical field `stats` is grouped by, such
+                    as status, type or components
       --width, -w   Specify the command-line window size
 
+Data files ending with `gz` are gzip-compressed, directories (or locations
+ending with a path separator) hold an archive sharded by issue ID, and files
+ending with `.sqlite`, `.sqlite3` or `.db` are SQLite databases updated in
+place. Updates to a compressed data file are appended to a delta log beside it,
+which is compacted once it grows over a quarter of the data file.
+Data files are written in format version 2, files written in version 1
+(base64-encoded) are still read.
+
+The search index and the field index of a data file are kept beside it
+with suffix `.search` and `.query`. They are rebuilt whenever the data
+file is written, and updated with the issues merged into it. A search
+index whose building was interrupted is built again by `search`.
+
+The metadata file is a NumPy array of the status and last activity indexed by
+issue ID, see `pyissues.meta`. Metadata saved as JSON is still read, and
+`meta.json` is read in place of a missing `meta.npy`.
+
+While `serve` is running for a data file, `show`, `load`, `query` and
+`search` are answered by it through the socket beside the data file with
+suffix `.sock`, it loads the data file again once it changes.
+
+`show` streams an issue longer than the terminal into the pager given by
+environment variable `PAGER` (`less` by default, empty to disable).
+
 If Python is initiated with argument `-i`, the returned value will be stored in
 `ret` local variable.
 """
@@ -31,22 +83,34 @@ from __future__ import annotations
 
 import argparse
 import functools
-import io
-import json
-import multiprocessing
-import operator
 import os
 import sys
 import time
-from typing import Any, Callable, Dict, Iterable, List, Set
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
+)
 
-from . import base as base
-from . import cli as cli
 from . import const as const
-from . import io as issuesIO
-from . import network as network
+from . import lazy_import
 from . import version as _version
 
+# The other modules are imported on first use, so that a sub-command only pays
+# for the imports it needs
+multiprocessing = lazy_import("multiprocessing")
+np = lazy_import("numpy")
+
+base = lazy_import(".base")
+cli = lazy_import(".cli")
+fetchjob = lazy_import(".job")
+issuesDaemon = lazy_import(".daemon")
+issuesIO = lazy_import(".io")
+issuesMeta = lazy_import(".meta")
+issuesQuery = lazy_import(".query")
+issuesSearch = lazy_import(".search")
+issuesStats = lazy_import(".stats")
+network = lazy_import(".network")
+pagecache = lazy_import(".cache")
+
 sub_commands: Dict[str, Callable] = {}
 
 
@@ -67,205 +131,502 @@ def is_compressed(_: str) -> str:
     return _[-2:] == "gz"
 
 
+def is_sharded(_: str) -> bool:
+    return os.path.isdir(_) or _[-1:] in ("/", os.sep)
+
+
+def is_sqlite(_: str) -> bool:
+    return os.path.splitext(_)[1] in (".sqlite", ".sqlite3", ".db")
+
+
 def compare_meta(
-    old: List[Set[int]], new: List[Set[int]], fullupdate: bool = True
+    old: np.ndarray, new: np.ndarray, fullupdate: bool = True
 ) -> Set[int]:
     """Compare two metadata
 
     Parameters: 
 
-    - `old`: `List[Set[int]]`, the old metadata
-    - `new`: `List[Set[int]]`, the new metadata
+    - `old`: `np.ndarray`, the old metadata, see `pyissues.meta`
+    - `new`: `np.ndarray`, the new metadata
     - `fullupdate`: `bool`, if `True`, all of the open issues will be included
-    """
 
+    Returns: `Set[int]`, ID of the new issues, the reopened issues and the
+    issues with new activity
+    """
     def _numbering(start: int = 1) -> str:
         i = start
         while True:
             yield str(i) + "."
             i += 1
 
+    old, new = issuesMeta.align(old, new)
+    old_status, new_status = old['status'], new['status']
+    known, present = old_status != 0, new_status != 0
     number = _numbering(1)
-    sub = new[0] - old[0]
-    print(next(number), "%d issues newly added." % (len(sub)))
+    added = present & ~known
+    counts = np.bincount(new_status[added], minlength=5)
+    print(next(number), "%d issues newly added." % (counts.sum()))
     print("  ", ", ".join([
-        str(len(sub & new[_])) + " " + const._STATUS[_] for _ in range(1, 5)
+        str(counts[_]) + " " + const._STATUS[_] for _ in range(1, 5)
     ]), end=".\n")
+    counts = np.bincount(new_status[old_status == 1], minlength=5)
     for i in range(2, 5):
         print(next(number), "%d open issues are now %s" %
-              (len(old[1] & new[i]), const._STATUS[i]), end=".\n")
-    return new[0] - old[0] | new[0 if fullupdate else 2] - old[2]
-
-
-def reshape_meta(o: Dict[int | str, int]) -> List[Set[int]]:
-    """Convert the CSV data to sets
+              (counts[i], const._STATUS[i]), end=".\n")
+    ret = added | (present if fullupdate else new_status == 2) & (old_status != 2)
+    # Metadata saved before the activity was recorded holds no activity, such
+    # issues are selected by their status alone, as without activity, so that
+    # the closed issues are not all fetched again after the migration
+    unknown = known & present & np.isnat(old['activity'])
+    changed = known & present & ~unknown & (old['activity'] != new['activity'])
+    print(next(number), "%d issues changed since last update" %
+          (changed.sum(), ), end="")
+    if unknown.any():
+        print(", %d issues without recorded activity" % (unknown.sum(), ),
+              end="")
+    print(".")
+    ret |= changed | unknown & (old_status != 2)
+    return set(issuesMeta.ids(ret))
+
+
+def read_meta(path: str) -> np.ndarray:
+    """Load the metadata, see `pyissues.meta`, falling back to the JSON
+    metadata with the same name if there is no such file
 
     Parameters:
 
-    - `o`: `Dict[int | str, int]`, data to be converted
+    - `path`: `str`, the filename
 
-    Returns: `List[Set[int]]`
-
-    - The first set contains ID of all issues;
-    - The second set contains ID of closed issues;
-    - The third set contains ID of open issues;
-    - The fourth set contains ID of pending issues;
-    - The fifth set contains ID of languishing issues.
+    Returns: `np.ndarray`
     """
-    ret: List[Set[int]] = [set() for _ in range(5)]
-    for i in o:
-        ret[o[i]].add(int(i))
-    ret[0] = functools.reduce(operator.or_, ret[1:])
-    return ret
+    legacy = os.path.splitext(path)[0] + ".json"
+    if not os.path.exists(path) and os.path.exists(legacy):
+        print("Migrating %s." % (legacy, ))
+        return issuesMeta.load(legacy)
+    return issuesMeta.load(path)
 
 
-def update_meta(
-    meta: Dict[int, int], path: str | io.IOBase = "meta.json"
-) -> None:
-    """Save the data to local JSON file
+def update_meta(meta: np.ndarray, path: str = "meta.npy") -> None:
+    """Save the metadata
 
     Parameters:
 
-    - `meta`: Dict[int, int], CSV data
-    - `path`: `str` or `io.IOBase`, the filename
+    - `meta`: `np.ndarray`, the metadata, see `pyissues.meta`
+    - `path`: `str`, the filename
 
     Returns: `None`
     """
-    if isinstance(path, str) and path:
-        with open(path, "w", encoding="utf-8") as file:
-            json.dump(meta, file)
-    elif isinstance(path, io.IOBase):
-        json.dump(meta, path)
+    issuesMeta.save(meta, path)
 
 
 def refresh_meta(
-    new: Dict[int, int],
-    path: str | io.IOBase | None = "meta.json",
+    new: np.ndarray,
+    path: str | np.ndarray | None = "meta.npy",
     fullupdate: bool = True
 ) -> Set[int]:
     if isinstance(path, str) and path:
-        with open(path, "r", encoding="utf-8") as file:
-            old = json.load(file)
-    elif isinstance(path, io.IOBase):
-        old = json.load(path)
-    elif isinstance(path, dict):
+        old = read_meta(path)
+    elif isinstance(path, np.ndarray):
         old = path
     else:
-        old = {}
-    old = reshape_meta(old)
-    new = reshape_meta(new)
+        old = np.zeros(0, dtype=issuesMeta.DTYPE)
     return compare_meta(old, new, fullupdate)
 
 
-def fetch(records: Iterable[int], threads: int | None = 16) -> List[base.Issue]:
+def fetch(
+    records: Iterable[int],
+    threads: int | None = 16,
+    engine: str = "process",
+    cache: str | None = None,
+    io_workers: int | None = None,
+    cpu_workers: int | None = None,
+    resume: bool = False,
+    command: str | None = None,
+    target: str | None = None,
+    parser: str | None = None,
+    **kwargs
+) -> Iterator[base.Issue] | None:
+    """Fetch the issues and yield them as soon as they are fetched, in no
+    particular order.
+
+    Every fetched issue is also saved in the journal of the job, so that an
+    interrupted job can be resumed with `resume`, the issues fetched before
+    are yielded first. A job is only resumed by the same sub-command
+    (`command`) for the same data file (`target`) and the same issues. The
+    journal should be removed with `finish_job` after the issues are written.
+
+    Returns: `Iterator[base.Issue]`, or `None` if the job is not resumed
+    """
+    job = fetchjob.FetchJob()
+    if resume and job.exists():
+        if not job.matches(records, command, target):
+            command, target = job.owner()
+            owner = "by `%s` for %s" % (command, target) if command else \
+                "by an older version"
+            print("The last job was started %s with other issues, run again "
+                  "without --resume to discard it." % (owner, ))
+            return None
+        print("Resuming the last job.")
+        records, resumed = job.remaining(), True
+    else:
+        job.start(records, command, target)
+        resumed = False
+    return _fetch(
+        job, records, threads, engine, cache, io_workers, cpu_workers, resumed,
+        parser
+    )
+
+
+def _fetch(
+    job: fetchjob.FetchJob,
+    records: Iterable[int],
+    threads: int | None = 16,
+    engine: str = "process",
+    cache: str | None = None,
+    io_workers: int | None = None,
+    cpu_workers: int | None = None,
+    resumed: bool = False,
+    parser: str | None = None
+) -> Iterator[base.Issue]:
+    if resumed:
+        yield from job.issues()
     print("Fetching %d issues from bugs.python.org" % (len(records), ))
     if threads is not None:
         threads = int(threads)
-    with multiprocessing.Pool(threads) as pool:
-        start = time.time()
-        ret = pool.map(network.get_data, map(int, records))
-        end = time.time()
-    ret = list(filter(lambda _: _ is not None, ret))
+    start, pool = time.time(), None
+    # Statistics of the connections of every fetching process
+    workers: Dict[int, Dict[str, int]] = {}
+    try:
+        if engine == "async":
+            network.set_cache(cache)
+            results = network.iter_many_async(
+                records, concurrency=threads or 100, parser=parser
+            )
+        elif engine == "pipeline":
+            network.set_cache(cache)
+            results = network.fetch_pipeline(
+                records,
+                io_workers=int(io_workers or threads or 32),
+                cpu_workers=int(cpu_workers) if cpu_workers else None,
+                parser=parser
+            )
+        else:
+            pool = multiprocessing.Pool(
+                threads, initializer=network.init_worker,
+                initargs=(cache, 1, parser)
+            )
+            results = _worker_results(pool.imap_unordered(
+                network.fetch_one_stats, map(int, records)
+            ), workers)
+        for page, issue in results:
+            job.record(page, issue)
+            if issue is not None:
+                yield issue
+        # The downloads of the pipeline are made by threads of this process,
+        # the async engine does not use the sessions
+        if engine != "async":
+            stats = network.sum_stats(workers.values()) if pool is not None \
+                else network.session_stats()
+            print("%d requests sent over %d connections" %
+                  (stats['requests'], stats['connections']))
+    finally:
+        job.close()
+        if pool is not None:
+            pool.terminate()
+    end = time.time()
+    ids, done, failed = job.load()
     print("%d issues fetched in %s" %
-          (len(ret), time.strftime("%H:%M:%S", time.gmtime(end - start)))
+          (len(done), time.strftime("%H:%M:%S", time.gmtime(end - start)))
           )
-    return ret
+    if failed - done:
+        print("%d issues failed, run again with --resume to retry." %
+              (len(failed - done), ))
+
+
+def _worker_results(
+    results: Iterable[Tuple[int, base.Issue, int, Dict[str, int]]],
+    workers: Dict[int, Dict[str, int]]
+) -> Iterator[Tuple[int, base.Issue]]:
+    # Only the latest statistics of every worker are kept, they are cumulative
+    for page, issue, pid, stats in results:
+        workers[pid] = stats
+        yield page, issue
+
+
+def finish_job() -> bool:
+    """Remove the journal of the job once the fetched issues are written,
+    unless some issues failed, so that `--resume` fetches them again
+
+    Returns: `bool`, whether the journal is removed
+    """
+    job = fetchjob.FetchJob()
+    if job.exists() and job.failed():
+        return False
+    job.finish()
+    return True
+
+
+def read(path: str = "issues.xml.gz", container: type = dict, lazy: bool = False):
+    """Load the issues from the data file, the fields are decoded on first
+    access if `lazy`.
+    """
+    if is_sqlite(path):
+        return issuesIO.sqlite_load(path, container)
+    elif is_sharded(path):
+        return issuesIO.shard_load(path, container, lazy=lazy)
+    elif is_compressed(path):
+        return issuesIO.xmlloadCompressed(path, container, lazy)
+    return issuesIO.xmlload(path, container, lazy)
+
+
+def read_one(path: str, _id: int) -> base.Issue | None:
+    try:
+        if is_sqlite(path):
+            return issuesIO.sqlite_get_issue(path, _id)
+        elif is_sharded(path):
+            return issuesIO.shard_get_issue(path, _id)
+        elif is_compressed(path):
+            return issuesIO.get_issue(path, _id)
+    except KeyError:
+        return None
+    return next(
+        filter(lambda _: int(_._id) == _id, issuesIO.iter_issues(path)), None
+    )
+
+
+def read_many(
+    path: str, ids: List[int], client: issuesDaemon.Client | None = None
+) -> List[base.Issue | None]:
+    """Read the issues with the IDs from the daemon serving the data file if
+    connected, or from the data file, `None` for those not found"""
+    if client is not None:
+        return client.get(ids)
+    return [read_one(path, _) for _ in ids]
+
+
+def search_index(path: str) -> issuesSearch.SearchIndex:
+    return issuesSearch.SearchIndex(issuesSearch.index_path(path))
+
 
+def query_index(path: str) -> issuesQuery.QueryIndex:
+    return issuesQuery.QueryIndex(issuesQuery.index_path(path))
 
-def write(
-    obj: List[base.Issue], path: str = "issues.xml.gz"
-) -> List[base.Issue]:
-    if is_compressed(path):
-        issuesIO.xmldumpCompressed(obj, path)
+
+def write(obj: Iterable[base.Issue], path: str = "issues.xml.gz") -> int:
+    """Write the issues to the data file, the issues are streamed into the
+    file as they come if `obj` is a generator. The search index and the field
+    index are rebuilt along the way.
+
+    Returns: `int`, the number of issues written
+    """
+    for index in (search_index(path), query_index(path)):
+        obj = index.feed(obj, replace=True)
+    if is_sqlite(path):
+        count = issuesIO.sqlite_dump(obj, path)
+    elif is_sharded(path):
+        count = issuesIO.shard_dump(obj, path)
     else:
-        issuesIO.xmldump(obj, path)
-    print("%d issues written to %s" % (len(obj), path))
-    return obj
+        count = issuesIO.stream_dump(obj, path, compressed=is_compressed(path))
+    print("%d issues written to %s" % (count, path))
+    return count
+
+
+def merge(obj: Iterable[base.Issue], path: str = "issues.xml.gz") -> int:
+    """Merge the new or updated issues into the data file, and into the search
+    index and the field index if they exist
+
+    Returns: `int`, the number of issues merged
+    """
+    for index in (search_index(path), query_index(path)):
+        if index.exists() and os.path.exists(path):
+            obj = index.feed(obj)
+    if is_sqlite(path):
+        count = issuesIO.sqlite_update(obj, path)
+        print("%d issues written to %s" % (count, path))
+        return count
+    elif is_sharded(path):
+        obj = list(obj)
+        count = issuesIO.shard_update(obj, path)
+        print("%d issues written to %d shards in %s" % (len(obj), count, path))
+        return len(obj)
+    elif is_compressed(path) and os.path.exists(path):
+        count = issuesIO.append_delta(obj, path)
+        print("%d issues appended to %s" % (count, issuesIO.delta_path(path)))
+        if issuesIO.needs_compaction(path):
+            compact(datafile=path)
+        return count
+    issues = read(path, dict, lazy=True)
+    for _ in obj:
+        issues[int(_._id)] = _
+    return write(issues, path)
 
 
 @sub_command
-def rebuild(
-        *, metafile: str = "meta.json", threads: int | None = None, **kwargs):
+def rebuild(*,
+            metafile: str = "meta.npy",
+            datafile: str = "issues.xml.gz",
+            threads: int | None = None,
+            engine: str = "process",
+            cache: str | None = None, **kwargs):
     print("Fetching list.")
     new_list = network.get_list()
-    update = set()
-    with open(metafile, "w+") as file:
-        json.dump({}, file)
-        file.seek(0)
-        update = refresh_meta(new_list, file)
-        json.dump(new_list, file)
+    update = refresh_meta(new_list, None)
+    update_meta(new_list, metafile)
     print("Fetching issues.")
-    return write(fetch(update, threads))
+    issues = fetch(update, threads, engine, cache,
+                   command="rebuild", target=datafile, **kwargs)
+    if issues is None:
+        return None
+    ret = write(issues, datafile)
+    finish_job()
+    return ret
 
 
 @sub_command
-def refetch(
-        *, metafile: str = "meta.json", threads: int | None = None, **kwargs):
-    with open(metafile, "r") as file:
-        update = refresh_meta(json.load(file), {})
+def refetch(*,
+            metafile: str = "meta.npy",
+            datafile: str = "issues.xml.gz",
+            threads: int | None = None,
+            engine: str = "process",
+            cache: str | None = None, **kwargs):
+    update = refresh_meta(read_meta(metafile), None)
     print("%d issues loaded." % (len(update), ))
     print("Fetching issues.")
-    return write(fetch(update, threads))
+    issues = fetch(update, threads, engine, cache,
+                   command="refetch", target=datafile, **kwargs)
+    if issues is None:
+        return None
+    ret = write(issues, datafile)
+    finish_job()
+    return ret
 
 
 @sub_command
-def check(*, metafile: str = "meta.json", **kwargs):
+def check(*, metafile: str = "meta.npy", **kwargs):
     print("Fetching list.")
     new_list = network.get_list()
-    update = set()
-    with open(metafile, "r") as file:
-        update = refresh_meta(new_list, file)
-    return update
+    return refresh_meta(new_list, metafile)
 
 
 @sub_command
 def fix(*,
-        metafile: str = "meta.json",
+        metafile: str = "meta.npy",
         datafile: str = "issues.xml.gz",
         threads: int | None = None,
+        engine: str = "process",
+        cache: str | None = None,
         **kwargs
         ):
     print("Loading list,")
-    with open(metafile, "r") as file:
-        update = refresh_meta(json.load(file), {})
+    update = refresh_meta(read_meta(metafile), None)
     print("Loading issues.")
-    issues = issuesIO.xmlloadCompressed(datafile)
-    issuesID = {int(_._id) for _ in issues}
+    issuesID = set(read(datafile, dict, lazy=True))
     print("%d issues not fetched." % (len(update - issuesID), ))
-    issues.extend(fetch(update - issuesID, threads))
-    return write(issues)
+    issues = fetch(update - issuesID, threads, engine, cache,
+                   command="fix", target=datafile, **kwargs)
+    if issues is None:
+        return None
+    ret = merge(issues, datafile)
+    finish_job()
+    return ret
 
 
 @sub_command
 def update(*,
            fullupdate: bool = False,
-           metafile: str = "meta.json",
+           metafile: str = "meta.npy",
            datafile: str = "issues.xml.gz",
-           threads: int | None = None, **kwargs):
+           threads: int | None = None,
+           engine: str = "process",
+           cache: str | None = None, **kwargs):
     print("Loading list.")
     new_list = network.get_list()
     update = refresh_meta(new_list, metafile, fullupdate=fullupdate)
     if update:
-        print("Loading issues.")
-        issues = issuesIO.xmlloadCompressed(datafile, dict)
-        new_issues = fetch(update, threads)
-        for _ in new_issues:
-            issues[int(_._id)] = _
-        write(issues)
-        update_meta(new_list)
+        issues = fetch(update, threads, engine, cache,
+                       command="update", target=datafile, **kwargs)
+        if issues is None:
+            return None
+        merge(issues, datafile)
+        # The failed issues are only selected again with the old metadata
+        if finish_job():
+            update_meta(new_list, metafile)
     else:
         print("No change detected.")
         return None
 
 
+@sub_command
+def reparse(*,
+            datafile: str = "issues.xml.gz",
+            threads: int | None = None,
+            cache: str | None = None,
+            parser: str | None = None, **kwargs):
+    if not cache or not os.path.isdir(cache):
+        print("Page cache %s not found." % (cache, ))
+        return None
+    pages = pagecache.PageCache(cache).pages()
+    print("Parsing %d cached issues." % (len(pages), ))
+    if threads is not None:
+        threads = int(threads)
+    with multiprocessing.Pool(
+        threads, initializer=network.set_cache, initargs=(cache, )
+    ) as pool:
+        start = time.time()
+        ret = write(filter(
+            lambda _: _ is not None,
+            pool.imap_unordered(
+                functools.partial(network.parse_cached, parser=parser),
+                pages, chunksize=16
+            )
+        ), datafile)
+        end = time.time()
+    print("%d issues parsed in %s" %
+          (ret, time.strftime("%H:%M:%S", time.gmtime(end - start)))
+          )
+    return ret
+
+
 @sub_command
 def load(*, datafile: str = "issues.xml.gz", **kwargs):
-    print("Loading issues.")
-    issues = issuesIO.xmlloadCompressed(datafile, dict)
+    client = issuesDaemon.connect(datafile)
+    if client is not None:
+        print("Loading issues.")
+        issues = {int(_._id): _ for _ in client.get()}
+    else:
+        count = None if is_sqlite(datafile) else issuesIO.count_issues(datafile)
+        if count is None:
+            print("Loading issues.")
+        else:
+            print("Loading %d issues, not counting the delta log." % (count, ))
+        issues = read(datafile, dict)
     print("Loaded issues are saved in `ret`")
     return issues
 
 
+@sub_command
+def compact(*, datafile: str = "issues.xml.gz", **kwargs):
+    if not os.path.exists(issuesIO.delta_path(datafile)):
+        print("No delta log found for %s." % (datafile, ))
+        return None
+    print("Compacting %s." % (datafile, ))
+    count = issuesIO.compact(datafile)
+    print("%d issues written to %s" % (count, datafile))
+
+
+@sub_command
+def convert(*,
+            datafile: str = "issues.xml.gz",
+            outfile: str | None = None, **kwargs):
+    if outfile is None:
+        print("Upgrading %s to format version %d." % (
+            datafile, base.FORMAT_VERSION
+        ))
+        outfile = datafile
+    print("Loading issues.")
+    return write(read(datafile, list, lazy=True), outfile)
+
+
 @sub_command
 def version(**kwargs):
     print(_version.__version__)
@@ -274,12 +635,135 @@ def version(**kwargs):
 @sub_command
 def show(*, datafile: str = "issues.xml.gz", _id: int, width: int, **kwargs):
     print("Loading issues.")
-    issues = issuesIO.xmlloadCompressed(datafile, dict)
     if _id is not None:
         _id = int(_id)
     if width is not None:
         width = int(width)
-    cli.display(issues[_id], width=width)
+    client = issuesDaemon.connect(datafile)
+    if client is not None:
+        output = client.show(_id, width)
+        if output is None:
+            print("Issue %s not found in %s." % (_id, datafile))
+        else:
+            cli.page(output.splitlines())
+        return None
+    issue = read_one(datafile, _id)
+    if issue is None:
+        print("Issue %s not found in %s." % (_id, datafile))
+    else:
+        cli.display(issue, width=width)
+
+
+@sub_command
+def search(*,
+           datafile: str = "issues.xml.gz",
+           query: str | None = None,
+           limit: int | None = None,
+           **kwargs):
+    if query is None:
+        print("The query is not specified.")
+        return None
+    limit = 10 if limit is None else int(limit)
+    client = issuesDaemon.connect(datafile)
+    index = client or search_index(datafile)
+    if client is None and not index.exists():
+        print("Building the search index of %s." % (datafile, ))
+        for _ in index.feed(read(datafile, list, lazy=True), replace=True):
+            pass
+    start = time.perf_counter()
+    results = index.search(query, limit)
+    count = index.count(query)
+    print("%d results in %.1f ms." % (
+        count, (time.perf_counter() - start) * 1000
+    ))
+    issues = read_many(datafile, [_ for _, score in results], client)
+    for (_id, score), issue in zip(results, issues):
+        if issue is None:
+            continue
+        print("%7d  %6.2f  %s" % (_id, score, issue.title))
+        print("                 %s" % (issuesSearch.snippet(issue, query), ))
+    if count > len(results):
+        print("... and %d more." % (count - len(results), ))
+    return results
+
+
+@sub_command
+def query(*,
+          datafile: str = "issues.xml.gz",
+          query: str | None = None,
+          limit: int | None = None,
+          **kwargs):
+    if query is None:
+        print("The conditions are not specified.")
+        return None
+    limit = 20 if limit is None else int(limit)
+    client = issuesDaemon.connect(datafile)
+    index = client or query_index(datafile)
+    if client is None and not index.exists():
+        print("Building the field index of %s." % (datafile, ))
+        for _ in index.feed(read(datafile, list, lazy=True), replace=True):
+            pass
+    start = time.perf_counter()
+    try:
+        results = (client or index.load()).select(query)
+    except ValueError as e:
+        print(e)
+        return None
+    print("%d issues in %.1f ms." % (
+        len(results), (time.perf_counter() - start) * 1000
+    ))
+    issues = read_many(datafile, results[:limit], client)
+    for _id, issue in zip(results, issues):
+        if issue is not None:
+            print("%7d  %-10s %s" % (_id, issue.status, issue.title))
+    if len(results) > limit:
+        print("... and %d more." % (len(results) - limit, ))
+    return results
+
+
+@sub_command
+def stats(*,
+          datafile: str = "issues.xml.gz",
+          unit: str = "year",
+          by: str | None = None,
+          **kwargs):
+    print("Loading issues.")
+    columns = issuesStats.load(datafile, lambda: read(datafile, list, lazy=True))
+    try:
+        rows = issuesStats.summarize(columns, unit, by)
+    except ValueError as e:
+        print(e)
+        return None
+    header = ["period", "created", "open", "closed", "median days", "p90 days"]
+    if by is not None:
+        header.insert(1, by)
+    line = "%-20s " + "%-24s " * (by is not None) + "%8s %8s %8s %12s %10s"
+    print(line % tuple(header))
+    for row in rows:
+        fields = [row['period']]
+        if by is not None:
+            fields.append(row['category'][:24])
+        fields += [
+            row['created'], row['open'], row['closed'],
+            "%.1f" % (row['median_days'], ), "%.1f" % (row['p90_days'], )
+        ]
+        print(line % tuple(fields))
+    return rows
+
+
+@sub_command
+def serve(*, datafile: str = "issues.xml.gz", **kwargs):
+    if not issuesDaemon.supported():
+        print("Unix domain sockets are not supported.")
+        return None
+    if issuesDaemon.connect(datafile) is not None:
+        print("%s is already served." % (datafile, ))
+        return None
+    daemon = issuesDaemon.Daemon(
+        datafile, lambda: read(datafile, dict, lazy=True)
+    )
+    print("Serving %s on %s." % (datafile, issuesDaemon.socket_path(datafile)))
+    daemon.serve()
 
 
 def main(*args) -> Any:
@@ -296,18 +780,54 @@ def main(*args) -> Any:
     parser.add_argument(
         '--fullupdate', '-fu',
         action='store_const', dest='fullupdate', const=True, default=None)
+    parser.add_argument(
+        '--resume', '-r',
+        action='store_const', dest='resume', const=True, default=False)
     parser.add_argument(
         '--threads', '-t',
         nargs='?', dest='threads', default=None)
+    parser.add_argument(
+        '--engine', '-e',
+        nargs='?', dest='engine', default='process',
+        choices=['process', 'async', 'pipeline'])
+    parser.add_argument(
+        '--io-workers',
+        nargs='?', dest='io_workers', default=None)
+    parser.add_argument(
+        '--cpu-workers',
+        nargs='?', dest='cpu_workers', default=None)
+    parser.add_argument(
+        '--parser',
+        nargs='?', dest='parser', default=None,
+        choices=['bs4', 'lxml'])
+    parser.add_argument(
+        '--cache', '-c',
+        nargs='?', dest='cache', default='pages')
     parser.add_argument(
         '--meta', '-m',
-        nargs='?', dest='metafile', default='meta.json')
+        nargs='?', dest='metafile', default='meta.npy')
     parser.add_argument(
         '--data', '-d',
         nargs='?', dest='datafile', default='issues.xml.gz')
+    parser.add_argument(
+        '--output', '-o',
+        nargs='?', dest='outfile', default=None)
     parser.add_argument(
         '--issue', '-i',
         nargs='?', dest='_id', default=None)
+    parser.add_argument(
+        '--query', '-q',
+        nargs='?', dest='query', default=None)
+    parser.add_argument(
+        '--limit', '-l',
+        nargs='?', dest='limit', default=None)
+    parser.add_argument(
+        '--unit', '-u',
+        nargs='?', dest='unit', default='year',
+        choices=list(const._TIME_UNITS))
+    parser.add_argument(
+        '--by', '-b',
+        nargs='?', dest='by', default=None)
     parser.add_argument(
         '--width', '-w',
         nargs='?', dest='width', default="80")
@@ -1,19 +1,33 @@
 """Base module of pyissues package
 
 This module provides data model for issues and comments from the Python Issue
-Tracker (https://bugs.python.org) with methods to save the issue in
-base64-encoded XML format.
+Tracker (https://bugs.python.org) with methods to save the issue in XML format.
+
+Version 1 of the format base64-encodes the text of the issues. Version 2 stores
+the text as it is and only escapes the characters forbidden in XML, a forbidden
+character is written as U+E000 followed by its code point in 4 hexadecimal
+digits, and U+E000 itself is escaped the same way.
 """
 from __future__ import annotations
 
 import base64
+import re
+import sys
 import warnings
-from typing import List
+from typing import Any, Callable, Dict, List
 
 import lxml.etree
 
 from . import const
 
+FORMAT_VERSION = 2
+
+_ESCAPE_MARK = "\ue000"
+_FORBIDDEN = re.compile(
+    "[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ue000\ufffe\uffff]"
+)
+_ESCAPED = re.compile(_ESCAPE_MARK + "([0-9a-f]{4})")
+
 
 class UnreadableXMLWarning(Exception):
     """Warning to be raised when fields are written into XML without base64
@@ -28,13 +42,76 @@ class UnreadableXMLWarning(Exception):
         return super().__str__()
 
 
+def _intern(o: Any) -> Any:
+    if isinstance(o, str):
+        return sys.intern(o)
+    elif isinstance(o, list):
+        return [sys.intern(_) if isinstance(_, str) else _ for _ in o]
+    return o
+
+
+def _get_state(o: Any) -> Dict[str, Any]:
+    # Reads the slots without falling back to `__getattr__`, so that the lazily
+    # loaded fields are copied or pickled without being decoded
+    ret = dict(getattr(o, '__dict__', {}))
+    for key in type(o).__slots__:
+        if key != '__dict__':
+            try:
+                ret[key] = object.__getattribute__(o, key)
+            except AttributeError:
+                pass
+    return ret
+
+
+def _set_state(o: Any, state: Dict[str, Any]) -> None:
+    for key in state:
+        setattr(o, key, state[key])
+
+
 class Comment():
+    __slots__ = ('url', 'author', 'content', 'username', 'date', '_raw')
+
     def __init__(self, url: str, author: str, content: str, date: str, username: str):
         self.url = url
         self.author = author
         self.content = content
         self.username = username
         self.date = date
+        for key in const._COMMENT_CATEGORICAL:
+            setattr(self, key, _intern(getattr(self, key)))
+
+    @staticmethod
+    def _lazy(text: str | None, decoder: Callable, **kwargs) -> Comment:
+        """Build a comment whose content is decoded on first access"""
+        ret = Comment(content=None, **kwargs)
+        del ret.content
+        ret._raw = (decoder, text)
+        return ret
+
+    def __getattr__(self, name: str):
+        # Only called for unset attributes, the content of a lazily loaded
+        # comment is decoded on first access
+        if name == 'content':
+            try:
+                decoder, raw = self._raw
+            except AttributeError:
+                pass
+            else:
+                try:
+                    self.content = decoder(raw)
+                except:
+                    self.content = ""
+                del self._raw
+                return self.content
+        raise AttributeError(
+            "'Comment' object has no attribute '%s'" % (name, )
+        )
+
+    def asdict(self) -> Dict[str, str]:
+        return {_: getattr(self, _) for _ in const._COMMENT_FIELD | {'username'}}
+
+    __getstate__ = _get_state
+    __setstate__ = _set_state
 
     @staticmethod
     def get_fields() -> List[str]:
@@ -57,13 +134,70 @@ class Comment():
 
 
 class Issue():
+    # Fields not listed in `const._ISSUE_FIELD`, such as `read_only`, are kept
+    # in the `__dict__` created on demand
+    __slots__ = tuple(sorted(const._ISSUE_FIELD)) + ('_raw', '_format', '__dict__')
+
     def __init__(self, **kwargs):
         for key in const._ISSUE_FIELD:
             setattr(self, key, "" if key in const._ISSUE_ATTRIBUTES else [])
         for key in kwargs:
-            setattr(self, key, kwargs[key])
+            if key in const._ISSUE_CATEGORICAL:
+                setattr(self, key, _intern(kwargs[key]))
+            else:
+                setattr(self, key, kwargs[key])
         self._id = str(self._id)
 
+    def __getattr__(self, name: str):
+        # Only called for unset attributes, the fields of a lazily loaded issue
+        # are decoded on first access
+        if name != '_raw':
+            raw = getattr(self, '_raw', None)
+            if raw is not None and name in raw:
+                value = self._decode_field(name, raw.pop(name))
+                setattr(self, name, value)
+                return value
+        raise AttributeError(
+            "'Issue' object has no attribute '%s'" % (name, )
+        )
+
+    def _decode_field(self, name: str, raw: Any) -> Any:
+        decoder = self._decoder(self._format)
+        if name in const._ISSUE_NODES:
+            return [
+                {_: decoder(record.attrib[_]) for _ in record.attrib}
+                for record in lxml.etree.fromstring(raw)
+            ]
+        elif name in const._ISSUE_COMPLEX:
+            return [
+                Comment._lazy(record.text, decoder, **record.attrib)
+                for record in lxml.etree.fromstring(raw)
+            ]
+        elif name in const._ISSUE_CATEGORICAL:
+            return sys.intern(decoder(raw))
+        return decoder(raw)
+
+    def _raw_value(self, name: str, version: int) -> Any:
+        """The encoded value of a lazily loaded field, `None` if the field is
+        decoded or modified since loaded, or saved in another format version
+        """
+        raw = getattr(self, '_raw', None)
+        if raw is None or name not in raw or self._format != version:
+            return None
+        try:
+            object.__getattribute__(self, name)
+        except AttributeError:
+            return raw[name]
+        return None
+
+    def asdict(self) -> Dict[str, Any]:
+        ret = {_: getattr(self, _) for _ in const._ISSUE_FIELD}
+        ret.update(vars(self))
+        return ret
+
+    __getstate__ = _get_state
+    __setstate__ = _set_state
+
     def __repr__(self) -> str:
         return "<Issue at %s>" % (self._id)
 
@@ -84,9 +218,47 @@ class Issue():
     def _decode(o: str) -> str:
         return base64.standard_b64decode(o).decode(encoding="utf-8")
 
-    def dump(self, encode: bool = True) -> lxml.etree.Element:
+    @staticmethod
+    def _escape(o: str) -> str:
+        return _FORBIDDEN.sub(lambda _: "%s%04x" % (_ESCAPE_MARK, ord(_[0])), o)
+
+    @staticmethod
+    def _unescape(o: str) -> str:
+        if _ESCAPE_MARK not in o:
+            return o
+        return _ESCAPED.sub(lambda _: chr(int(_[1], 16)), o)
+
+    @staticmethod
+    def _decoder(version: int) -> Callable[[str], str]:
+        if version == 1:
+            return Issue._decode
+        elif version == 2:
+            return Issue._unescape
+        raise ValueError("Unsupported format version %s" % (version, ))
+
+    @staticmethod
+    def _encoder(version: int) -> Callable[[str], str]:
+        if version == 1:
+            return Issue._encode
+        elif version == 2:
+            return Issue._escape
+        raise ValueError("Unsupported format version %s" % (version, ))
+
+    def dump(
+        self, encode: bool = True, version: int = FORMAT_VERSION
+    ) -> lxml.etree.Element:
+        """Build the XML element of the issue
+
+        Parameters:
+
+        - `encode`: `bool`, whether to encode the text, see `UnreadableXMLWarning`
+        - `version`: `int`, the format version, 1 for base64-encoded text, 2 for
+          escaped text
+
+        Returns: `lxml.etree.Element`
+        """
         if encode:
-            encoder = self._encode
+            encoder = self._encoder(version)
         else:
             encoder = str
             warnings.warn(UnreadableXMLWarning(
@@ -98,7 +270,11 @@ class Issue():
         ret_node = lxml.etree.Element("issue")
 
         for attr in const._ISSUE_ATTRIBUTES:
-            ret_node.set(attr, encoder(str(getattr(self, attr, ''))))
+            raw = self._raw_value(attr, version) if encode else None
+            if raw is not None:
+                ret_node.set(attr, raw)
+            else:
+                ret_node.set(attr, encoder(str(getattr(self, attr, ''))))
 
         for attr in const._ISSUE_MULTIPLE_ATTRIBUTES:
             for record in getattr(self, attr, None):
@@ -108,6 +284,10 @@ class Issue():
 
         for attr in const._ISSUE_NODES:
             new_node = lxml.etree.Element(attr)
+            raw = self._raw_value(attr, version) if encode else None
+            if raw is not None:
+                ret_node.append(lxml.etree.fromstring(raw))
+                continue
             for record in getattr(self, attr, None):
                 new_sub_node = lxml.etree.Element(attr[:-1])
                 for field in record:
@@ -117,6 +297,10 @@ class Issue():
 
         for attr in const._ISSUE_COMPLEX:
             new_node = lxml.etree.Element(attr)
+            raw = self._raw_value(attr, version) if encode else None
+            if raw is not None:
+                ret_node.append(lxml.etree.fromstring(raw))
+                continue
             for record in getattr(self, attr, None):
                 new_sub_node = lxml.etree.Element(attr[:-1])
                 for field in record.get_fields():
@@ -127,11 +311,46 @@ class Issue():
 
         return ret_node
 
-    def _load(self, root: lxml.etree._element, decode: bool = True):
-        decoder = self._decode if decode else str
+    def _load_lazy(self, root: lxml.etree._element, version: int):
+        raw = {}
+        attributes = root.attrib
+        for attr, value in attributes.items():
+            if attr == '_id':
+                self._id = self._decoder(version)(value)
+                continue
+            attr = sys.intern(attr)
+            raw[attr] = value
+            try:
+                delattr(self, attr)
+            except AttributeError:
+                pass
+        for child in root:
+            if child.tag in const._ISSUE_MULTIPLE_ATTRIBUTES:
+                getattr(self, child.tag).append(
+                    None if child.text is None else sys.intern(child.text)
+                )
+            elif child.tag in const._ISSUE_NODES or \
+                    child.tag in const._ISSUE_COMPLEX:
+                # Kept as a single serialized element, which takes much less
+                # memory than a string for every field of every record
+                raw[child.tag] = lxml.etree.tostring(child, with_tail=False)
+        for attr in raw:
+            if attr in const._ISSUE_NODES or attr in const._ISSUE_COMPLEX:
+                delattr(self, attr)
+        self._raw = raw
+        self._format = version
+        return self
+
+    def _load(
+        self, root: lxml.etree._element, decode: bool = True, version: int = 1
+    ):
+        decoder = self._decoder(version) if decode else str
         attributes = root.attrib
         for attr in attributes:
-            setattr(self, attr, decoder(attributes[attr]))
+            if attr in const._ISSUE_CATEGORICAL:
+                setattr(self, attr, sys.intern(decoder(attributes[attr])))
+            else:
+                setattr(self, attr, decoder(attributes[attr]))
         data = {}
         for attr in const._ISSUE_MULTIPLE_ATTRIBUTES:
             data[attr] = []
@@ -142,7 +361,9 @@ class Issue():
 
         for child in root:
             if child.tag in const._ISSUE_MULTIPLE_ATTRIBUTES:
-                data[child.tag].append(child.text)
+                data[child.tag].append(
+                    None if child.text is None else sys.intern(child.text)
+                )
             elif child.tag in const._ISSUE_NODES:
                 for subchild in child:
                     data[child.tag].append({
@@ -163,6 +384,27 @@ class Issue():
         return self
 
     @staticmethod
-    def load(root: lxml.etree._element, decode: bool = True) -> Issue:
+    def load(
+        root: lxml.etree._element,
+        decode: bool = True,
+        lazy: bool = False,
+        version: int = 1
+    ) -> Issue:
+        """Build an issue from its XML element
+
+        Parameters:
+
+        - `root`: `lxml.etree._element`, the `issue` element
+        - `decode`: `bool`, whether the fields are base64-encoded
+        - `lazy`: `bool`, whether to keep the encoded fields and decode each
+          of them on first access, the comments are decoded the same way.
+          Unaccessed fields are written back without being decoded.
+        - `version`: `int`, the format version of the document holding the
+          element, the `version` attribute of the `issues` element
+
+        Returns: `Issue`
+        """
         ret = Issue()
-        return ret._load(root, decode)
+        if lazy and decode:
+            return ret._load_lazy(root, version)
+        return ret._load(root, decode, version)
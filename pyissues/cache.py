@@ -0,0 +1,110 @@
+"""Page cache module of pyissues package
+
+This module keeps the raw HTML pages downloaded from the Python Issue Tracker
+(https://bugs.python.org) in a content-addressed, gzip-compressed store, so
+that the issues can be parsed again without fetching them.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List
+
+
+class PageCache():
+    """Store of raw issue pages
+
+    Every distinct page is saved once under `objects/`, named after the SHA-256
+    digest of its content. `refs/` maps every issue ID to the digest of its
+    latest page and the time it was fetched. All of the files are written to a
+    temporary file first, so the store can be shared by multiple processes.
+    """
+
+    def __init__(self, root: str = "pages"):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "refs"), exist_ok=True)
+
+    def _object(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest[2:] + ".gz")
+
+    def _ref(self, page: int) -> str:
+        return os.path.join(self.root, "refs", "%d.json" % (int(page), ))
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        tmp = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+        with open(tmp, "wb") as file:
+            file.write(data)
+        os.replace(tmp, path)
+
+    def put(self, page: int, content: bytes, fetched: float | None = None) -> str:
+        """Save the raw page of an issue
+
+        Parameters:
+
+        - `page`: `int`, the issue ID
+        - `content`: `bytes`, the raw page
+        - `fetched`: `float` or `None`, the time the page was fetched, the
+          current time if `None`
+
+        Returns: `str`, the digest of the page
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._object(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write(path, gzip.compress(content, mtime=0))
+        ref = {
+            'digest': digest,
+            'fetched': time.time() if fetched is None else fetched
+        }
+        self._write(self._ref(page), json.dumps(ref).encode())
+        return digest
+
+    def ref(self, page: int) -> Dict:
+        """Load the digest and fetch time of an issue page
+
+        Parameters:
+
+        - `page`: `int`, the issue ID
+
+        Returns: `Dict`, raises `KeyError` if the page is not cached
+        """
+        try:
+            with open(self._ref(page), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            raise KeyError(page) from None
+
+    def get(self, page: int) -> bytes:
+        """Load the raw page of an issue
+
+        Parameters:
+
+        - `page`: `int`, the issue ID
+
+        Returns: `bytes`, raises `KeyError` if the page is not cached
+        """
+        with open(self._object(self.ref(page)['digest']), "rb") as file:
+            return gzip.decompress(file.read())
+
+    def fetched(self, page: int) -> float:
+        return self.ref(page)['fetched']
+
+    def pages(self) -> List[int]:
+        """IDs of all of the cached issues in ascending order"""
+        return sorted(
+            int(_[:-5]) for _ in os.listdir(os.path.join(self.root, "refs"))
+            if _.endswith(".json")
+        )
+
+    def __contains__(self, page: int) -> bool:
+        return os.path.exists(self._ref(page))
+
+    def __len__(self) -> int:
+        return len(self.pages())
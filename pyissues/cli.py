@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 import itertools
-from typing import Dict, Iterable, List
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple
 
-from . import base
+if TYPE_CHECKING:
+    from . import base
 
 _WIDTH = 80
+# Borders and column widths of the tables, by config and line width
+_layouts: Dict[Tuple[int, int], Tuple[List[Dict], List[Tuple], str]] = {}
 
 
 table_config = [
@@ -64,7 +72,7 @@ def _get_horiz_line(
         tabs_down: List[int] = list(),
         length: int = _WIDTH,
         char: str = "-") -> str:
-    splits, ret = set(), ""
+    splits = set()
     base = 0
     for i in tabs_up:
         base += 3 + i
@@ -74,9 +82,7 @@ def _get_horiz_line(
         base += 3 + i
         splits.add(base)
     splits.add(0)
-    for _ in range(length):
-        ret += "+" if _ in splits else char
-    return ret
+    return "".join("+" if _ in splits else char for _ in range(length))
 
 
 def _get_verti_line(tabs: int):
@@ -130,6 +136,7 @@ def _str_splitter(o: str, length: int) -> str:
 
 def _merger(*fields, tabs: int, width: List[int]) -> Iterable[str]:
     matrix = list(itertools.starmap(_str_splitter, zip(fields, width)))
+    verti_line = _get_verti_line(tabs)
     flag, line = True, []
     while flag:
         flag = False
@@ -141,7 +148,7 @@ def _merger(*fields, tabs: int, width: List[int]) -> Iterable[str]:
             except StopIteration:
                 line.append(" " * width[i])
         if flag:
-            yield _get_verti_line(tabs) % tuple(line)
+            yield verti_line % tuple(line)
 
 
 def _process_tab(tab: Dict, **kwargs):
@@ -151,41 +158,119 @@ def _process_tab(tab: Dict, **kwargs):
         return tab["prefix"] + tab["sep"].join(kwargs[tab["name"]])
 
 
+def _layout(
+        config: List[Dict], line_width: int) -> Tuple[List[Tuple], str]:
+    """Upper border, number of tabs and column widths of every row of a
+    table, and the closing border of the table, computed once per config and
+    line width. The config is kept with its layout, so that its ID is not
+    reused.
+    """
+    key = (id(config), line_width)
+    if key not in _layouts:
+        rows, last_line, char = [], [], "="
+        for _ in config:
+            width = _get_tab_width(_["tabs"], width=line_width)
+            rows.append((
+                _get_horiz_line(last_line, width, length=line_width, char=char),
+                _["tabs"],
+                width
+            ))
+            last_line = width
+            char = "-"
+        closing = _get_horiz_line(last_line, [], length=line_width, char="=")
+        _layouts[key] = (config, rows, closing)
+    return _layouts[key][1:]
+
+
+def _table_lines(
+        config: List[Dict], line_width: int, kwargs: Dict) -> Iterator[str]:
+    rows, closing = _layout(config, line_width)
+    for _, (horiz_line, tabs, width) in zip(config, rows):
+        yield horiz_line
+        data = []
+        for tab in _["cells"]:
+            data.append(_process_tab(tab, **kwargs))
+        lines = list(_merger(*data, tabs=tabs, width=width))
+        yield from lines or [""]
+
+
+def _pager() -> str | None:
+    command = os.environ.get("PAGER", "less")
+    if command.strip() and shutil.which(shlex.split(command)[0]):
+        return command
+    return None
+
+
+def page(lines: Iterable[str]) -> None:
+    """Write the lines to the standard output in a single write, or, if it is
+    a terminal and they do not fit in it, stream them into the pager given by
+    environment variable `PAGER` (`less` by default, empty to disable). The
+    lines are taken from `lines` as the pager reads them.
+
+    Parameters:
+
+    - `lines`: `Iterable[str]`, the lines without line breaks, can be a
+      generator
+
+    Returns: `None`
+    """
+    lines = iter(lines)
+    command = _pager() if sys.stdout.isatty() else None
+    if command is not None:
+        height = shutil.get_terminal_size().lines
+        head = list(itertools.islice(lines, height))
+        if len(head) < height:
+            command = None
+        lines = itertools.chain(head, lines)
+    if command is None:
+        sys.stdout.write("".join(_ + "\n" for _ in lines))
+        sys.stdout.flush()
+        return None
+
+    sys.stdout.flush()
+    process = subprocess.Popen(
+        command, shell=True, stdin=subprocess.PIPE,
+        encoding=sys.stdout.encoding, errors="backslashreplace"
+    )
+    # Quitting the pager closes the pipe
+    try:
+        with process.stdin as pipe:
+            try:
+                for _ in lines:
+                    pipe.write(_ + "\n")
+            except KeyboardInterrupt:
+                pass
+    except OSError:
+        pass
+    while True:
+        try:
+            process.wait()
+            break
+        except KeyboardInterrupt:
+            pass
+
+
 def make_table(
         config: List[Dict], *,
         omit_last_line: bool = False,
         last_line: List[int] = [],
         line_width: int = _WIDTH,
         **kwargs):
-    last_line = []
-    char = "="
-    for _ in config:
-        width = _get_tab_width(_["tabs"], width=line_width)
-        print(_get_horiz_line(last_line, width, length=line_width, char=char))
-        last_line = width
-        data = []
-        for tab in _["cells"]:
-            data.append(_process_tab(tab, **kwargs))
-        print(*_merger(*data, tabs=_["tabs"], width=width), sep="\n")
-        char = "-"
+    lines = list(_table_lines(config, line_width, kwargs))
+    rows, closing = _layout(config, line_width)
     if not omit_last_line:
-        print(_get_horiz_line(last_line, [], length=line_width, char="="))
-    return last_line
+        lines.append(closing)
+    page(lines)
+    return rows[-1][2] if rows else []
 
 
-def display(o: base.Issue, *, width: int = _WIDTH) -> None:
-    last_line = make_table(
-        table_config,
-        omit_last_line=True,
-        line_width=width,
-        **vars(o)
-    )
+def _display_lines(o: base.Issue, width: int) -> Iterator[str]:
+    yield from _table_lines(table_config, width, o.asdict())
     for _ in o.messages:
-        last_line = make_table(
-            message_config,
-            omit_last_line=True,
-            last_line=last_line,
-            line_width=width,
-            **vars(_)
-        )
-    print(_get_horiz_line(last_line, [], length=width, char="="), flush=True)
+        yield from _table_lines(message_config, width, _.asdict())
+    yield _layout(message_config if o.messages else table_config, width)[1]
+
+
+def display(o: base.Issue, *, width: int = _WIDTH) -> None:
+    """Display the issue and its messages as tables, see `page`"""
+    page(_display_lines(o, width))
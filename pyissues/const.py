@@ -1,6 +1,6 @@
 _HOME_URL = "https://bugs.python.org/"
 _ISSUE_URL = "https://bugs.python.org/issue%d"
-_ISSUE_LIST = "https://bugs.python.org/issue?@action=export_csv&@columns=id,status&@sort=id"
+_ISSUE_LIST = "https://bugs.python.org/issue?@action=export_csv&@columns=id,status,activity&@sort=id"
 
 _STATUS = {
     1: 'open',
@@ -27,6 +27,13 @@ _ISSUE_MULTIPLE_ATTRIBUTES = {
     'keywords', 'nosy_list', 'versions', 'components'
 }
 
+# Attributes with a small set of values repeated across issues, their values
+# are interned so that equal values share a single string
+_ISSUE_CATEGORICAL = {
+    'type', 'stage', 'status', 'resolution', 'priority', 'assigned_to',
+    'created_by', 'last_changed_by'
+} | _ISSUE_MULTIPLE_ATTRIBUTES
+
 _ISSUE_NODES = {
     'files', 'pull_requests'
 }
@@ -39,6 +46,10 @@ _COMMENT_FIELD = {
     'url', 'author', 'content', 'date'
 }
 
+_COMMENT_CATEGORICAL = {
+    'author', 'username'
+}
+
 _SPLIT_NEEDED = {
     'files': ('uploaded', 'date'),
     'pull_requests': ('linked', 'date')
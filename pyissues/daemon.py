@@ -0,0 +1,250 @@
+"""Daemon module of pyissues package
+
+This module keeps the issues of a data file in memory in a resident process,
+and answers requests over a Unix domain socket beside the data file, so that
+a lookup does not pay for loading the data file again. The data file is
+loaded again when it, its delta log or its field index changes.
+
+Requests and responses are pickled, every message is preceded by its length.
+The requests are unpickled without looking up any class or function, so that a
+request only holds builtin values. The socket is only accessible to its owner.
+"""
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import pickle
+import socket
+import socketserver
+import struct
+from typing import Any, Callable, Dict, List, Tuple
+
+from . import lazy_import
+
+# The modules used by the daemon are imported when it starts, so that the
+# clients do not import them
+base = lazy_import(".base")
+cli = lazy_import(".cli")
+issuesIO = lazy_import(".io")
+issuesQuery = lazy_import(".query")
+issuesSearch = lazy_import(".search")
+
+_HEADER = struct.Struct("!Q")
+
+
+def socket_path(path: str) -> str:
+    """Location of the socket of the daemon serving a data file"""
+    return path.rstrip("/" + os.sep) + ".sock"
+
+
+def supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def _send(file: io.BufferedIOBase, o: Any) -> None:
+    data = pickle.dumps(o, protocol=pickle.HIGHEST_PROTOCOL)
+    file.write(_HEADER.pack(len(data)) + data)
+    file.flush()
+
+
+class _RequestUnpickler(pickle.Unpickler):
+    """Unpickler of the requests, which only hold strings, numbers, `None`,
+    tuples and lists, the globals a pickle refers to are never loaded"""
+
+    def find_class(self, module: str, name: str) -> Any:
+        raise pickle.UnpicklingError(
+            "Global %s.%s is not allowed in a request" % (module, name)
+        )
+
+
+def _receive(file: io.BufferedIOBase, request: bool = False) -> Any:
+    header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise EOFError
+    data = file.read(_HEADER.unpack(header)[0])
+    if request:
+        return _RequestUnpickler(io.BytesIO(data)).load()
+    return pickle.loads(data)
+
+
+class Daemon():
+    """Issues of a data file kept in memory
+
+    The methods listed in `COMMANDS` can be called by the clients, see
+    `Client`.
+    """
+
+    COMMANDS = frozenset({'count', 'get', 'search', 'select', 'show'})
+
+    def __init__(self, path: str, loader: Callable[[], Dict[int, base.Issue]]):
+        self.path = path
+        self.loader = loader
+        self.signature = None
+        self.issues: Dict[int, base.Issue] = {}
+        self.index = issuesQuery.QueryIndex(issuesQuery.index_path(path))
+
+    def _signature(self) -> List[Tuple[int, int]]:
+        """Size and modification time of the files the issues are loaded
+        from"""
+        if os.path.isdir(self.path):
+            files = [os.path.join(self.path, issuesIO.MANIFEST)]
+        else:
+            files = [self.path, issuesIO.delta_path(self.path)]
+        ret = []
+        for _ in files + [self.index.path]:
+            try:
+                stat = os.stat(_)
+            except OSError:
+                ret.append(None)
+            else:
+                ret.append((stat.st_size, stat.st_mtime_ns))
+        return ret
+
+    def _refresh(self) -> None:
+        signature = self._signature()
+        if signature == self.signature:
+            return
+        print("Loading %s." % (self.path, ), flush=True)
+        self.issues = self.loader()
+        # The field index is built in memory if it is not saved
+        if self.index.exists():
+            self.index.load()
+        else:
+            self.index.clear()
+            self.index.update(self.issues.values())
+        self.signature = signature
+        print("%d issues loaded." % (len(self.issues), ), flush=True)
+
+    def get(self, ids: List[int] | None = None) -> List[base.Issue | None]:
+        """The issues with the IDs, `None` for those not found, or all of the
+        issues if `ids` is `None`"""
+        if ids is None:
+            return list(self.issues.values())
+        return [self.issues.get(_) for _ in ids]
+
+    def show(self, _id: int, width: int = 80) -> str | None:
+        """The issue as displayed by `cli.display`, `None` if not found"""
+        issue = self.issues.get(_id)
+        if issue is None:
+            return None
+        with io.StringIO() as file:
+            with contextlib.redirect_stdout(file):
+                cli.display(issue, width=width)
+            return file.getvalue()
+
+    def select(self, text: str) -> List[int]:
+        """See `query.QueryIndex.select`"""
+        return self.index.select(text)
+
+    def _search_index(self) -> issuesSearch.SearchIndex:
+        index = issuesSearch.SearchIndex(issuesSearch.index_path(self.path))
+        if not index.exists():
+            for _ in index.feed(self.issues.values(), replace=True):
+                pass
+        return index
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """See `search.SearchIndex.search`"""
+        return self._search_index().search(query, limit)
+
+    def count(self, query: str) -> int:
+        """See `search.SearchIndex.count`"""
+        return self._search_index().count(query)
+
+    def _handle(self, request: Tuple[str, tuple]) -> Tuple[bool, Any]:
+        if not isinstance(request, tuple) or len(request) != 2 or \
+                not isinstance(request[1], tuple):
+            return False, ValueError("Malformed request")
+        name, args = request
+        if name not in self.COMMANDS:
+            return False, ValueError("Unknown request %r" % (name, ))
+        try:
+            self._refresh()
+            return True, getattr(self, name)(*args)
+        except Exception as e:
+            return False, e
+
+    def serve(self) -> None:
+        """Serve the clients until interrupted, the requests are handled one
+        at a time"""
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+
+            def handle(self):
+                while True:
+                    try:
+                        request = _receive(self.rfile, request=True)
+                    except EOFError:
+                        return
+                    except pickle.UnpicklingError as e:
+                        _send(self.wfile, (False, ValueError(str(e))))
+                        continue
+                    _send(self.wfile, daemon._handle(request))
+
+        path = socket_path(self.path)
+        if os.path.exists(path):
+            os.remove(path)
+        self._refresh()
+        umask = os.umask(0o077)
+        try:
+            server = socketserver.UnixStreamServer(path, Handler)
+        finally:
+            os.umask(umask)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            os.remove(path)
+
+
+class Client():
+    """Daemon serving a data file, the methods of `Daemon` listed in
+    `Daemon.COMMANDS` are called as the methods of the client. Every call is
+    made over a new connection, so that an idle client does not hold the
+    daemon."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self) -> socket.socket:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(self.path)
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def call(self, name: str, *args) -> Any:
+        with self._connect() as connection, connection.makefile("rwb") as file:
+            _send(file, (name, args))
+            success, ret = _receive(file)
+        if not success:
+            raise ret
+        return ret
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args: self.call(name, *args)
+
+
+def connect(path: str) -> Client | None:
+    """Find the daemon serving a data file
+
+    Parameters:
+
+    - `path`: `str`, the data file
+
+    Returns: `Client` or `None` if no daemon is running
+    """
+    if not supported() or not os.path.exists(socket_path(path)):
+        return None
+    client = Client(socket_path(path))
+    try:
+        client._connect().close()
+    except OSError:
+        return None
+    return client
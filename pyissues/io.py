@@ -1,19 +1,85 @@
 from __future__ import annotations
 
+import functools
 import gzip
+import heapq
 import io
+import itertools
+import json
+import operator
+import os
+import re
 import time
+import zlib
 import lxml.etree
-from typing import Iterable, Iterable, Mapping
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple
 from collections import abc
 
-from . import base, const, util
+from . import base, const, lazy_import, util
+
+# Only the parallel loaders and the SQLite backend use them
+multiprocessing = lazy_import("multiprocessing")
+sqlite3 = lazy_import("sqlite3")
+
+BLOCK_SIZE = 64
+SHARD_SIZE = 1000
+MANIFEST = "manifest.json"
+COMPACT_RATIO = 0.25
+_CHUNK_SIZE = 1 << 20
+_BLOCK_PATTERN = re.compile(rb"\s*<issue[\s/>]")
+_SQLITE_ATTRIBUTES = sorted(const._ISSUE_ATTRIBUTES - {'_id'})
+_SQLITE_NODES = sorted(const._ISSUE_NODES)
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS issues (
+    id INTEGER PRIMARY KEY, {attributes}
+);
+CREATE INDEX IF NOT EXISTS issues_status ON issues (status);
+CREATE INDEX IF NOT EXISTS issues_type ON issues (type);
+CREATE INDEX IF NOT EXISTS issues_priority ON issues (priority);
+CREATE INDEX IF NOT EXISTS issues_created ON issues (created);
+CREATE INDEX IF NOT EXISTS issues_last_changed ON issues (last_changed);
+CREATE TABLE IF NOT EXISTS labels (
+    issue_id INTEGER NOT NULL, field TEXT NOT NULL, position INTEGER NOT NULL,
+    value TEXT, PRIMARY KEY (issue_id, field, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS labels_value ON labels (field, value);
+CREATE TABLE IF NOT EXISTS messages (
+    issue_id INTEGER NOT NULL, position INTEGER NOT NULL, url TEXT,
+    author TEXT, username TEXT, date TEXT, content TEXT,
+    PRIMARY KEY (issue_id, position)
+);
+{nodes}
+""".format(
+    attributes=", ".join(
+        "%s TEXT NOT NULL DEFAULT ''" % (_, ) for _ in _SQLITE_ATTRIBUTES
+    ),
+    # Files and pull requests are saved as JSON objects, as their fields
+    # follow the columns of the tables on the issue page
+    nodes="".join(
+        "CREATE TABLE IF NOT EXISTS %s (\n"
+        "    issue_id INTEGER NOT NULL, position INTEGER NOT NULL, data TEXT,\n"
+        "    PRIMARY KEY (issue_id, position)\n"
+        ");\n" % (_, ) for _ in _SQLITE_NODES
+    )
+)
+_SQLITE_UPSERT = (
+    "INSERT INTO issues (id, %s) VALUES (?%s) ON CONFLICT (id) DO UPDATE SET %s"
+    % (
+        ", ".join(_SQLITE_ATTRIBUTES),
+        ", ?" * len(_SQLITE_ATTRIBUTES),
+        ", ".join("%s = excluded.%s" % (_, _) for _ in _SQLITE_ATTRIBUTES)
+    )
+)
+_VERSION_PATTERN = re.compile(rb"<issues\s[^>]*\bversion=\"(\d+)\"")
+_ITEMS_PATTERN = re.compile(rb"<issues\s[^>]*\bitems=\"(\d+)\"")
 
 
 def domdump(o: Iterable[base.Issue]):
     ret_dom = lxml.etree.Element(
         "issues",
-        items=str(len(o)), last_fetched=str(time.time())
+        items=str(len(o)), last_fetched=str(time.time()),
+        version=str(base.FORMAT_VERSION)
     )
     issues_iter = util.MappingIterWrapper(o) if isinstance(o, Mapping) else o
     for issue in issues_iter:
@@ -21,50 +87,228 @@ def domdump(o: Iterable[base.Issue]):
     return ret_dom
 
 
-def xmldump(o: Iterable[base.Issue], fp: io.IOBase | str) -> None:
-    ret = domdump(o)
-    data = lxml.etree.tostring(ret)
-    if isinstance(fp, io.IOBase):
-        fp.write(data)
-    elif isinstance(fp, str):
-        with open(fp, "w", encoding="utf-8") as file:
-            file.write(data)
+class _CountingWriter():
+    def __init__(self, fp: io.IOBase):
+        self.fp = fp
+        self.written = 0
 
+    def write(self, data: bytes) -> int:
+        self.written += len(data)
+        return self.fp.write(data)
+
+    def flush(self) -> None:
+        self.fp.flush()
+
+
+class _MemberWriter():
+    """Binary sink that writes every block of issues as an independent gzip
+    member and records where each block starts and ends.
+    """
+
+    def __init__(self, fp: io.IOBase, **kwargs):
+        self.fp = _CountingWriter(fp)
+        self.kwargs = kwargs
+        self.blocks: List[List[int]] = []
+        self.issues: Dict[str, int] = {}
+        self._file = None
+        self._start = 0
+
+    def write(self, data: bytes) -> int:
+        if self._file is None:
+            self._start = self.fp.written
+            self._file = gzip.GzipFile(
+                filename="", fileobj=self.fp, mode="wb", **self.kwargs)
+        return self._file.write(data)
+
+    def split(self, ids: Iterable[int] = ()) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        ids = list(ids)
+        if ids:
+            for _ in ids:
+                self.issues[str(_)] = len(self.blocks)
+            self.blocks.append([self._start, self.fp.written - self._start])
+
+
+def _dump_to(
+    o: Iterable[base.Issue],
+    sink: io.IOBase,
+    block: int = BLOCK_SIZE,
+    version: int = base.FORMAT_VERSION
+) -> int:
+    attrib = {}
+    if isinstance(o, abc.Sized):
+        attrib['items'] = str(len(o))
+    attrib['last_fetched'] = str(time.time())
+    attrib['version'] = str(version)
+    issues_iter = util.MappingIterWrapper(o) if isinstance(o, Mapping) else o
+    split = sink.split if isinstance(sink, _MemberWriter) else None
+    count, ids = 0, []
+    with lxml.etree.xmlfile(sink) as xf:
+        with xf.element("issues", attrib):
+            if split is not None:
+                xf.flush()
+                split()
+            for issue in issues_iter:
+                xf.write(issue.dump(version=version))
+                count += 1
+                ids.append(int(issue._id))
+                if split is not None and len(ids) >= block:
+                    xf.flush()
+                    split(ids)
+                    ids = []
+            if split is not None:
+                xf.flush()
+                split(ids)
+    if split is not None:
+        split()
+    return count
 
-def xmldumpCompressed(o: Iterable[base.Issue], fp: io.IOBase | str, **kwargs) -> None:
-    ret = domdump(o)
-    data = gzip.compress(
-        lxml.etree.tostring(ret),
-        **kwargs
-    )
-    if isinstance(fp, io.IOBase):
-        fp.write(data)
-        fp.flush()
-    elif isinstance(fp, str):
-        with open(fp, "wb") as file:
-            file.write(data)
+
+def stream_dump(
+    o: Iterable[base.Issue],
+    fp: io.IOBase | str,
+    compressed: bool | None = None,
+    version: int = base.FORMAT_VERSION,
+    **kwargs
+) -> int:
+    """Write the issues one by one without building the whole document
+
+    Each issue is serialized and, if required, compressed as soon as it is
+    taken from `o`. The `items` attribute of the root element is only written
+    when the number of issues is known in advance, the index of a compressed
+    file records it in any case, see `count_issues`. Files are written to a
+    temporary file first and then moved to `fp`.
+
+    Parameters:
+
+    - `o`: `Iterable[base.Issue]`, the issues to be written, can be a generator
+    - `fp`: `str` or `io.IOBase`, the filename or a binary file object
+    - `compressed`: `bool` or `None`, whether to compress the document with
+      gzip, detected from the filename if `None`
+    - `version`: `int`, the format version, see `base.FORMAT_VERSION`
+    - `kwargs`: extra arguments passed to `gzip.GzipFile`
+
+    Compressed documents are written as a sequence of gzip members holding
+    `BLOCK_SIZE` issues each, and an index is saved beside compressed files so
+    that single issues can be read with `get_issue`. The delta log of a
+    compressed file is removed once the new file is in place.
+
+    Returns: `int`, the number of issues written
+    """
+    if compressed is None:
+        compressed = isinstance(fp, str) and fp[-2:] == "gz"
+    if isinstance(fp, str):
+        with open(fp + ".tmp", "wb") as file:
+            sink = _MemberWriter(file, **kwargs) if compressed else file
+            count = _dump_to(o, sink, version=version)
+        os.replace(fp + ".tmp", fp)
+        if compressed:
+            save_index(fp, sink.blocks, sink.issues, version, count)
+            if os.path.exists(delta_path(fp)):
+                os.remove(delta_path(fp))
+        return count
+    if compressed:
+        count = _dump_to(o, _MemberWriter(fp, **kwargs), version=version)
+    else:
+        count = _dump_to(o, fp, version=version)
+    fp.flush()
+    return count
+
+
+def xmldump(o: Iterable[base.Issue], fp: io.IOBase | str) -> int:
+    return stream_dump(o, fp, compressed=False)
+
+
+def xmldumpCompressed(o: Iterable[base.Issue], fp: io.IOBase | str, **kwargs) -> int:
+    return stream_dump(o, fp, compressed=True, **kwargs)
 
 
 def xmldumps(o: Iterable) -> str:
     return domdump(o).toxml()
 
 
-def domload(dom, container: type = list) -> Iterable[base.Issue]:
+def _print_fetched(dom) -> None:
     if dom.get('last_fetched') is not None:
         print("This content was saved at %s (local)." % (
             time.strftime(const._TIME_UNITS['second'], time.localtime(
                 float(dom.get('last_fetched'))
             )),
         ))
+
+
+def _is_gzip(fp: str | io.IOBase) -> bool:
+    if isinstance(fp, str):
+        return fp[-2:] == "gz"
+    if isinstance(fp, gzip.GzipFile):
+        return False
+    pos = fp.tell()
+    magic = fp.read(2)
+    fp.seek(pos)
+    return magic == b"\x1f\x8b"
+
+
+def iter_issues(
+    fp: str | io.IOBase,
+    compressed: bool | None = None,
+    verbose: bool = True,
+    lazy: bool = False
+) -> Iterator[base.Issue]:
+    """Lazily load the issues one by one from the XML document
+
+    Only one `issue` element is kept in the memory at a time, the element is
+    cleared as soon as the `Issue` object is built. The format version is read
+    from the root element.
+
+    Parameters:
+
+    - `fp`: `str` or `io.IOBase`, the filename or a binary file object
+    - `compressed`: `bool` or `None`, whether the document is gzip-compressed,
+      detected from the filename or the magic number if `None`
+    - `verbose`: `bool`, whether to print when the document was saved
+    - `lazy`: `bool`, whether to decode the fields on first access, see
+      `base.Issue.load`
+
+    Returns: `Iterator[base.Issue]`
+    """
+    if compressed is None:
+        compressed = _is_gzip(fp)
+    if isinstance(fp, str):
+        with open(fp, "rb") as file:
+            yield from iter_issues(file, compressed, verbose, lazy)
+        return
+    if compressed:
+        fp = gzip.GzipFile(fileobj=fp, mode="rb")
+    version = 1
+    for event, element in lxml.etree.iterparse(fp, events=("start", "end")):
+        if event == "start":
+            if element.tag == "issues":
+                version = int(element.get('version', 1))
+                if verbose:
+                    _print_fetched(element)
+            continue
+        if element.tag != "issue":
+            continue
+        yield base.Issue.load(element, lazy=lazy, version=version)
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+def domload(dom, container: type = list) -> Iterable[base.Issue]:
+    _print_fetched(dom)
+    version = int(dom.get('version', 1))
     if not isinstance(container(), abc.Mapping):
         ret = []
         for child in dom:
-            ret.append(base.Issue.load(child))
+            ret.append(base.Issue.load(child, version=version))
         return container(ret)
     else:
         ret = {}
         for child in dom:
-            new_issue = base.Issue.load(child)
+            new_issue = base.Issue.load(child, version=version)
             ret[int(new_issue._id)] = new_issue
         return container(ret)
 
@@ -76,20 +320,904 @@ def xmlloads(s: str, container: type = list) -> Iterable[base.Issue]:
     return ret
 
 
-def xmlload(fp: str | io.IOBase, container: type = list) -> Iterable[base.Issue]:
-    dom = lxml.etree.parse(fp)
-    ret = domload(dom, container)
-    del dom
+def _collect(
+    issues: Iterable[base.Issue], container: type = list
+) -> Iterable[base.Issue]:
+    if not isinstance(container(), abc.Mapping):
+        return container(issues)
+    return container((int(_._id), _) for _ in issues)
+
+
+def xmlload(
+    fp: str | io.IOBase, container: type = list, lazy: bool = False
+) -> Iterable[base.Issue]:
+    return _collect(iter_issues(fp, lazy=lazy), container)
+
+
+def xmlloadCompressed(
+    fp: str | io.IOBase,
+    container: type = list,
+    lazy: bool = False,
+    processes: int | None = None
+) -> Iterable[base.Issue]:
+    if isinstance(fp, str):
+        return _collect(parallel_load(fp, lazy, processes), container)
+    return _collect(iter_issues(fp, compressed=True, lazy=lazy), container)
+
+
+def index_path(path: str) -> str:
+    return path + ".idx"
+
+
+def save_index(
+    path: str,
+    blocks: List[List[int]],
+    issues: Dict[str, int],
+    version: int = base.FORMAT_VERSION,
+    items: int | None = None
+) -> Dict:
+    """Save the block index of a compressed archive beside the archive
+
+    Parameters:
+
+    - `path`: `str`, the filename of the archive
+    - `blocks`: `List[List[int]]`, offset and length of each gzip member
+    - `issues`: `Dict[str, int]`, maps issue ID to the block holding it
+    - `version`: `int`, the format version of the archive
+    - `items`: `int` or `None`, the number of issues in the archive, the
+      number of issue IDs if `None`
+
+    Returns: `Dict`, the saved index
+    """
+    stat = os.stat(path)
+    index = {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'version': version,
+        'items': len(issues) if items is None else items,
+        'blocks': blocks,
+        'issues': issues
+    }
+    with open(index_path(path), "w", encoding="utf-8") as file:
+        json.dump(index, file)
+    return index
+
+
+class _Member():
+    """Gzip member starting at the current position of a file, decompressed
+    as it is read.
+
+    `data` is the compressed input already read from the file, `length` counts
+    the compressed bytes of the member consumed so far.
+    """
+
+    def __init__(self, file: io.IOBase, data: bytes = b""):
+        self.file = file
+        self.data = data
+        self.length = 0
+        self._decompressor = zlib.decompressobj(31)
+        self._buffer = b""
+        self._position = 0
+        self._suffix = b""
+
+    def _fill(self) -> bool:
+        while not self._decompressor.eof:
+            if not self.data:
+                self.data = self.file.read(_CHUNK_SIZE)
+                if not self.data:
+                    raise EOFError(
+                        "Compressed file ended before the end-of-stream "
+                        "marker was reached"
+                    )
+            data = self._decompressor.decompress(self.data, _CHUNK_SIZE)
+            consumed = len(self.data)
+            if self._decompressor.eof:
+                self.data = self._decompressor.unused_data
+            else:
+                self.data = self._decompressor.unconsumed_tail
+            self.length += consumed - len(self.data)
+            if data:
+                self._buffer = self._buffer[self._position:] + data
+                self._position = 0
+                return True
+        return False
+
+    def peek(self, size: int) -> bytes:
+        """At most `size` decompressed bytes, without consuming them"""
+        while len(self._buffer) - self._position < size and self._fill():
+            pass
+        return self._buffer[self._position:self._position + size]
+
+    def read(self, size: int = -1) -> bytes:
+        """At most `size` decompressed bytes, all the remaining ones if `size`
+        is negative, empty at the end of the member
+        """
+        if size < 0:
+            chunks = [self._buffer[self._position:]]
+            self._buffer, self._position = b"", 0
+            while self._fill():
+                chunks.append(self._buffer)
+                self._buffer = b""
+            chunks.append(self._suffix)
+            self._suffix = b""
+            return b"".join(chunks)
+        if self._position == len(self._buffer):
+            self._fill()
+        data = self._buffer[self._position:self._position + size]
+        self._position += len(data)
+        if not data:
+            data, self._suffix = self._suffix, b""
+        return data
+
+    def wrap(self, prefix: bytes, suffix: bytes) -> None:
+        """Read `prefix` before the remaining content and `suffix` after it"""
+        self._buffer = prefix + self._buffer[self._position:]
+        self._position = 0
+        self._suffix = suffix
+
+    def drain(self) -> int:
+        """Skip the rest of the member, returns the compressed length"""
+        while self._fill():
+            self._buffer, self._position = b"", 0
+        return self.length
+
+
+def _member_head(member: _Member) -> bytes:
+    """The beginning of a gzip member, up to the end of the opening tag of the
+    document if the member holds it
+    """
+    size = 1024
+    while True:
+        data = member.peek(size)
+        start = data.find(b"<issues")
+        if len(data) < size or _BLOCK_PATTERN.match(data) is not None or \
+                start >= 0 and data.find(b">", start) >= 0:
+            return data
+        size *= 2
+
+
+def _iter_members(file: io.IOBase) -> Iterator[Tuple[int, _Member]]:
+    # The rest of every member is skipped when the next one is requested
+    start, data = 0, b""
+    while True:
+        if not data:
+            data = file.read(_CHUNK_SIZE)
+            if not data:
+                return
+        member = _Member(file, data)
+        yield start, member
+        start += member.drain()
+        data = member.data
+
+
+def _member_version(data: bytes) -> int | None:
+    """The format version declared by the root element in a gzip member,
+    `None` if the member does not hold the opening tag of the document
+    """
+    start = data.find(b"<issues")
+    if start < 0 or _BLOCK_PATTERN.match(data) is not None:
+        return None
+    match = _VERSION_PATTERN.match(data, start, data.find(b">", start) + 1)
+    return 1 if match is None else int(match[1])
+
+
+def _iter_elements(
+    data: bytes | _Member, version: int = 1
+) -> Iterator[Tuple[int, lxml.etree._Element]]:
+    # A block holds bare issue elements, other members are either the
+    # opening or closing tag of the document or a whole single-member archive,
+    # `version` only applies to blocks, whole documents declare their own.
+    # A `_Member` is parsed as it is decompressed.
+    if isinstance(data, bytes):
+        head, source = data, io.BytesIO(data)
+    else:
+        head, source = _member_head(data), data
+    is_block = _BLOCK_PATTERN.match(head) is not None
+    if is_block:
+        if isinstance(data, bytes):
+            source = io.BytesIO(b"<issues>" + data + b"</issues>")
+        else:
+            data.wrap(b"<issues>", b"</issues>")
+    else:
+        version = _member_version(head) or 1
+    found = False
+    try:
+        for _, element in lxml.etree.iterparse(source, tag="issue"):
+            found = True
+            yield version, element
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+    except lxml.etree.XMLSyntaxError:
+        if is_block or found:
+            raise
+
+
+def _element_id(element: lxml.etree._Element, version: int = 1) -> int:
+    return int(base.Issue._decoder(version)(element.get('_id')))
+
+
+def build_index(path: str) -> Dict:
+    """Scan a compressed archive and save the index of its gzip members, the
+    members are parsed as they are decompressed
+
+    Parameters:
+
+    - `path`: `str`, the filename of the archive
+
+    Returns: `Dict`, the saved index
+    """
+    blocks, issues, version, items = [], {}, 1, 0
+    with open(path, "rb") as file:
+        for offset, member in _iter_members(file):
+            version = _member_version(_member_head(member)) or version
+            found = False
+            for _version, element in _iter_elements(member, version):
+                issues[str(_element_id(element, _version))] = len(blocks)
+                items += 1
+                found = True
+            if found:
+                blocks.append([offset, member.drain()])
+    return save_index(path, blocks, issues, version, items)
+
+
+def load_index(path: str) -> Dict:
+    """Load the index of a compressed archive, the index is rebuilt and saved
+    if it is missing or older than the archive, which is reported.
+
+    Parameters:
+
+    - `path`: `str`, the filename of the archive
+
+    Returns: `Dict`, the index
+    """
+    try:
+        with open(index_path(path), "r", encoding="utf-8") as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        index = {}
+    stat = os.stat(path)
+    if index.get('size') != stat.st_size or \
+            index.get('mtime') != stat.st_mtime_ns:
+        print("Building the index of %s, this is only done once." % (path, ))
+        return build_index(path)
+    return index
+
+
+def count_issues(path: str) -> int | None:
+    """The number of issues in an archive, without loading the issues. The
+    delta log of the archive is not counted.
+
+    The `items` attribute of the root element is used if it was written, the
+    index is used otherwise for compressed archives, and the manifest for
+    sharded archives.
+
+    Parameters:
+
+    - `path`: `str`, the filename of the archive or the directory of the
+      sharded archive
+
+    Returns: `int`, or `None` if the number is not recorded
+    """
+    if os.path.isdir(path):
+        manifest = load_manifest(path)
+        return sum(_['items'] for _ in manifest['shards'].values())
+    with open(path, "rb") as file:
+        compressed = _is_gzip(file)
+        if compressed:
+            # Only the opening tag is decompressed, a single-member archive
+            # would be decompressed whole otherwise
+            try:
+                data = _member_head(_Member(file))
+            except (EOFError, zlib.error):
+                data = b""
+        else:
+            data = file.read(_CHUNK_SIZE)
+    start = data.find(b"<issues")
+    if start >= 0:
+        match = _ITEMS_PATTERN.match(data, start, data.find(b">", start) + 1)
+        if match is not None:
+            return int(match[1])
+    if not compressed:
+        return None
+    index = load_index(path)
+    return index.get('items', len(index['issues']))
+
+
+def get_issue(path: str, _id: int) -> base.Issue:
+    """Load a single issue from a compressed archive, only the gzip member
+    holding the issue is decompressed, up to the issue. The latest version in
+    the delta log takes precedence over the archive.
+
+    Parameters:
+
+    - `path`: `str`, the filename of the archive
+    - `_id`: `int`, the ID of the issue
+
+    Returns: `base.Issue`, raises `KeyError` if the issue is not found
+    """
+    _id = int(_id)
+    issue = None
+    for _ in iter_delta(path):
+        if int(_._id) == _id:
+            issue = _
+    if issue is not None:
+        return issue
+    index = load_index(path)
+    try:
+        offset = index['blocks'][index['issues'][str(_id)]][0]
+    except KeyError:
+        raise KeyError(_id) from None
+    with open(path, "rb") as file:
+        file.seek(offset)
+        member = _Member(file)
+        for version, element in _iter_elements(
+            member, index.get('version', 1)
+        ):
+            if _element_id(element, version) == _id:
+                return base.Issue.load(element, version=version)
+    raise KeyError(_id)
+
+
+def _load_blocks(
+    path: str, blocks: List[List[int]], version: int, lazy: bool = False
+) -> List[base.Issue]:
+    # The blocks are adjacent, so they are read at once
+    start = blocks[0][0]
+    with open(path, "rb") as file:
+        file.seek(start)
+        data = file.read(blocks[-1][0] + blocks[-1][1] - start)
+    ret = []
+    for offset, length in blocks:
+        member = zlib.decompress(data[offset - start:offset - start + length], 31)
+        for _version, element in _iter_elements(member, version):
+            ret.append(base.Issue.load(element, lazy=lazy, version=_version))
+    ret.sort(key=lambda _: int(_._id))
     return ret
 
 
-def xmlloadCompressed(fp: str | io.IOBase, container: type = list) -> Iterable[base.Issue]:
-    if isinstance(fp, io.IOBase):
-        data = gzip.decompress(fp.read()).decode(
-            encoding="utf-8", errors="ignore")
-        return xmlloads(data, container)
-    elif isinstance(fp, str):
-        with open(fp, "rb") as file:
-            data = gzip.decompress(file.read()).decode(
-                encoding="utf-8", errors="ignore")
-            return xmlloads(data, container)
+def _print_header(path: str, index: Dict) -> None:
+    with open(path, "rb") as file:
+        header = zlib.decompress(file.read(index['blocks'][0][0]), 31)
+    try:
+        _print_fetched(lxml.etree.fromstring(header + b"</issues>"))
+    except lxml.etree.XMLSyntaxError:
+        pass
+
+
+def parallel_load(
+    path: str, lazy: bool = False, processes: int | None = None
+) -> Iterable[base.Issue]:
+    """Load a compressed archive with its delta log merged over it, the gzip
+    members are decompressed and parsed in a process pool.
+
+    The members listed in the index are split into runs of adjacent members,
+    about four runs for every process, and every run is loaded by a process.
+    The issues are merged in ID order. Archives with a single member, such as
+    the ones written by other tools, are loaded with `iter_merged` instead, so
+    are all archives if there is a single processor.
+
+    Parameters:
+
+    - `path`: `str`, the filename of the compressed archive
+    - `lazy`: `bool`, whether to decode the fields on first access
+    - `processes`: `int` or `None`, size of the process pool, the number of
+      processors if `None`
+
+    Returns: `Iterable[base.Issue]`
+    """
+    processes = processes or os.cpu_count() or 1
+    index = load_index(path)
+    blocks = sorted(index['blocks'])
+    if processes <= 1 or len(blocks) <= 1:
+        return iter_merged(path, lazy=lazy)
+    _print_header(path, index)
+    size = -(-len(blocks) // (processes * 4))
+    runs = [blocks[_:_ + size] for _ in range(0, len(blocks), size)]
+    with multiprocessing.Pool(processes) as pool:
+        chunks = pool.map(functools.partial(
+            _load_blocks, path, version=index.get('version', 1), lazy=lazy
+        ), runs)
+    newer = {int(_._id): _ for _ in iter_delta(path, lazy)}
+    issues = _overlay(heapq.merge(*chunks, key=lambda _: int(_._id)), newer)
+    if not newer:
+        return issues
+    return sorted(issues, key=lambda _: int(_._id))
+
+
+def delta_path(path: str) -> str:
+    return path + ".delta"
+
+
+def append_issues(
+    o: Iterable[base.Issue], path: str | io.IOBase, **kwargs
+) -> int:
+    """Append the issues to an append-only log
+
+    Every `BLOCK_SIZE` issues are written as a complete gzip-compressed
+    document in its own gzip member, so the existing content of the log is
+    never rewritten.
+
+    Parameters:
+
+    - `o`: `Iterable[base.Issue]`, the issues to be appended
+    - `path`: `str` or `io.IOBase`, the filename of the log, or the log opened
+      for appending in binary mode, which is kept open
+    - `kwargs`: extra arguments passed to `gzip.GzipFile`
+
+    Returns: `int`, the number of issues appended
+    """
+    if isinstance(path, str):
+        with open(path, "ab") as file:
+            return append_issues(o, file, **kwargs)
+    issues_iter = util.MappingIterWrapper(o) if isinstance(o, Mapping) else o
+    issues_iter = iter(issues_iter)
+    count = 0
+    while True:
+        block = list(itertools.islice(issues_iter, BLOCK_SIZE))
+        if not block:
+            break
+        with gzip.GzipFile(
+            filename="", fileobj=path, mode="wb", **kwargs
+        ) as member:
+            count += _dump_to(block, member)
+        path.flush()
+    return count
+
+
+def iter_appended(path: str, lazy: bool = False) -> Iterator[base.Issue]:
+    """Load the issues from an append-only log in the order they were written
+
+    A gzip member truncated by an interrupted write at the end of the log is
+    ignored.
+
+    Parameters:
+
+    - `path`: `str`, the filename of the log
+    - `lazy`: `bool`, whether to decode the fields on first access
+
+    Returns: `Iterator[base.Issue]`, empty if the log does not exist
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as file:
+        try:
+            for _, member in _iter_members(file):
+                for version, element in _iter_elements(member):
+                    yield base.Issue.load(element, lazy=lazy, version=version)
+        except EOFError:
+            return
+
+
+def append_delta(o: Iterable[base.Issue], path: str) -> int:
+    """Record new versions of the issues in the delta log of an archive
+
+    Parameters:
+
+    - `o`: `Iterable[base.Issue]`, the new or updated issues
+    - `path`: `str`, the filename of the compressed archive
+
+    Returns: `int`, the number of issues recorded
+    """
+    return append_issues(o, delta_path(path))
+
+
+def iter_delta(path: str, lazy: bool = False) -> Iterator[base.Issue]:
+    return iter_appended(delta_path(path), lazy)
+
+
+def _overlay(
+    issues: Iterable[base.Issue], newer: Dict[int, base.Issue]
+) -> Iterator[base.Issue]:
+    for issue in issues:
+        yield newer.pop(int(issue._id), issue)
+    for _id in sorted(newer):
+        yield newer[_id]
+
+
+def iter_merged(
+    path: str, verbose: bool = True, lazy: bool = False
+) -> Iterator[base.Issue]:
+    """Lazily load the issues of a compressed archive with its delta log
+    merged over it, the latest version of an issue wins.
+
+    Only the delta log is kept in the memory.
+
+    Parameters:
+
+    - `path`: `str`, the filename of the compressed archive
+    - `verbose`: `bool`, whether to print when the archive was saved
+    - `lazy`: `bool`, whether to decode the fields on first access
+
+    Returns: `Iterator[base.Issue]`
+    """
+    newer = {int(_._id): _ for _ in iter_delta(path, lazy)}
+    return _overlay(iter_issues(path, True, verbose, lazy), newer)
+
+
+def needs_compaction(path: str, ratio: float = COMPACT_RATIO) -> bool:
+    try:
+        delta = os.path.getsize(delta_path(path))
+    except FileNotFoundError:
+        return False
+    return delta > os.path.getsize(path) * ratio
+
+
+def compact(path: str, **kwargs) -> int:
+    """Fold the delta log into a fresh compressed archive
+
+    Parameters:
+
+    - `path`: `str`, the filename of the compressed archive
+    - `kwargs`: extra arguments passed to `gzip.GzipFile`
+
+    Returns: `int`, the number of issues written
+    """
+    # The issues are copied without being decoded
+    return stream_dump(
+        iter_merged(path, lazy=True), path, compressed=True, **kwargs
+    )
+
+
+def shard_name(shard: int) -> str:
+    return "issues-%06d.xml.gz" % (shard, )
+
+
+def load_manifest(path: str) -> Dict:
+    """Load the manifest of a sharded archive
+
+    Parameters:
+
+    - `path`: `str`, the directory of the sharded archive
+
+    Returns: `Dict`, an empty manifest if the archive does not exist
+    """
+    try:
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {'shard_size': SHARD_SIZE, 'shards': {}}
+
+
+def save_manifest(path: str, manifest: Dict) -> None:
+    filename = os.path.join(path, MANIFEST)
+    with open(filename + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(filename + ".tmp", filename)
+
+
+def _group_shards(
+    o: Iterable[base.Issue], shard_size: int
+) -> Dict[int, Dict[int, base.Issue]]:
+    ret = {}
+    issues_iter = util.MappingIterWrapper(o) if isinstance(o, Mapping) else o
+    for issue in issues_iter:
+        _id = int(issue._id)
+        ret.setdefault(_id // shard_size, {})[_id] = issue
+    return ret
+
+
+def _write_shards(
+    shards: Dict[int, Dict[int, base.Issue]], path: str, manifest: Dict
+) -> int:
+    count = 0
+    for shard in sorted(shards):
+        issues = [shards[shard][_] for _ in sorted(shards[shard])]
+        xmldumpCompressed(issues, os.path.join(path, shard_name(shard)))
+        manifest['shards'][str(shard)] = {
+            'file': shard_name(shard),
+            'items': len(issues),
+            'last_fetched': time.time()
+        }
+        count += len(issues)
+    save_manifest(path, manifest)
+    return count
+
+
+def shard_dump(
+    o: Iterable[base.Issue], path: str, shard_size: int = SHARD_SIZE
+) -> int:
+    """Write the issues into a sharded archive, replacing its content
+
+    Every shard holds the issues with ID in a range of `shard_size`, and is
+    written in the same format as `xmldumpCompressed`.
+
+    Parameters:
+
+    - `o`: `Iterable[base.Issue]`, the issues to be written
+    - `path`: `str`, the directory of the sharded archive
+    - `shard_size`: `int`, the number of IDs covered by a shard
+
+    Returns: `int`, the number of issues written
+    """
+    os.makedirs(path, exist_ok=True)
+    old = load_manifest(path)
+    shards = _group_shards(o, shard_size)
+    manifest = {'shard_size': shard_size, 'shards': {}}
+    count = _write_shards(shards, path, manifest)
+    for shard in old['shards']:
+        if shard not in manifest['shards']:
+            filename = os.path.join(path, old['shards'][shard]['file'])
+            for _ in (filename, index_path(filename)):
+                if os.path.exists(_):
+                    os.remove(_)
+    return count
+
+
+def shard_update(o: Iterable[base.Issue], path: str) -> int:
+    """Merge the issues into a sharded archive, only the shards holding the
+    given issues are rewritten.
+
+    Parameters:
+
+    - `o`: `Iterable[base.Issue]`, the new or updated issues
+    - `path`: `str`, the directory of the sharded archive
+
+    Returns: `int`, the number of shards rewritten
+    """
+    os.makedirs(path, exist_ok=True)
+    manifest = load_manifest(path)
+    shards = _group_shards(o, manifest['shard_size'])
+    for shard in shards:
+        if str(shard) in manifest['shards']:
+            filename = os.path.join(path, manifest['shards'][str(shard)]['file'])
+            old = {
+                int(_._id): _ for _ in iter_issues(filename, True, False)
+            }
+            old.update(shards[shard])
+            shards[shard] = old
+    _write_shards(shards, path, manifest)
+    return len(shards)
+
+
+def _load_shard(filename: str, lazy: bool = False) -> List[base.Issue]:
+    return list(iter_issues(filename, True, False, lazy))
+
+
+def shard_load(
+    path: str,
+    container: type = list,
+    processes: int | None = None,
+    lazy: bool = False
+) -> Iterable[base.Issue]:
+    """Load a sharded archive, the shards are parsed in a process pool.
+
+    Parameters:
+
+    - `path`: `str`, the directory of the sharded archive
+    - `container`: `type`, `list` or a mapping type keyed by issue ID
+    - `processes`: `int` or `None`, size of the process pool
+    - `lazy`: `bool`, whether to decode the fields on first access
+
+    Returns: `Iterable[base.Issue]`
+    """
+    manifest = load_manifest(path)
+    files = [
+        os.path.join(path, manifest['shards'][_]['file'])
+        for _ in sorted(manifest['shards'], key=int)
+    ]
+    with multiprocessing.Pool(processes) as pool:
+        shards = pool.map(functools.partial(_load_shard, lazy=lazy), files)
+    return _collect((issue for shard in shards for issue in shard), container)
+
+
+def shard_get_issue(path: str, _id: int) -> base.Issue:
+    """Load a single issue from a sharded archive
+
+    Parameters:
+
+    - `path`: `str`, the directory of the sharded archive
+    - `_id`: `int`, the ID of the issue
+
+    Returns: `base.Issue`, raises `KeyError` if the issue is not found
+    """
+    _id = int(_id)
+    manifest = load_manifest(path)
+    shard = str(_id // manifest['shard_size'])
+    if shard not in manifest['shards']:
+        raise KeyError(_id)
+    return get_issue(
+        os.path.join(path, manifest['shards'][shard]['file']), _id
+    )
+
+
+def _sqlite_connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    connection.executescript(_SQLITE_SCHEMA)
+    return connection
+
+
+def _sqlite_write(
+    connection: sqlite3.Connection, o: Iterable[base.Issue], replace: bool = True
+) -> int:
+    count = 0
+    issues_iter = util.MappingIterWrapper(o) if isinstance(o, Mapping) else o
+    for issue in issues_iter:
+        _id = int(issue._id)
+        connection.execute(_SQLITE_UPSERT, [_id] + [
+            str(getattr(issue, _, '')) for _ in _SQLITE_ATTRIBUTES
+        ])
+        if replace:
+            for table in ["labels", "messages"] + _SQLITE_NODES:
+                connection.execute(
+                    "DELETE FROM %s WHERE issue_id = ?" % (table, ), (_id, )
+                )
+        connection.executemany("INSERT INTO labels VALUES (?, ?, ?, ?)", [
+            (_id, field, position, value)
+            for field in sorted(const._ISSUE_MULTIPLE_ATTRIBUTES)
+            for position, value in enumerate(getattr(issue, field, None) or [])
+        ])
+        connection.executemany(
+            "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)", [
+                (_id, position, _.url, _.author, _.username, _.date, _.content)
+                for position, _ in enumerate(issue.messages)
+            ]
+        )
+        for table in _SQLITE_NODES:
+            connection.executemany(
+                "INSERT INTO %s VALUES (?, ?, ?)" % (table, ), [
+                    (_id, position, json.dumps(record))
+                    for position, record in enumerate(getattr(issue, table))
+                ]
+            )
+        count += 1
+    connection.execute(
+        "INSERT OR REPLACE INTO info VALUES ('last_fetched', ?)",
+        (str(time.time()), )
+    )
+    return count
+
+
+def sqlite_dump(o: Iterable[base.Issue], path: str) -> int:
+    """Write the issues into a SQLite database, replacing its content
+
+    The fields of the issues are saved in table `issues`, one row per issue,
+    with indexes on status, type, priority and the creation and last change
+    times. Keywords, nosy list, versions and components are saved in table
+    `labels` indexed by field and value, messages, files and pull requests are
+    saved in their own tables. The database is written to a temporary file
+    first and then moved to `path`.
+
+    Parameters:
+
+    - `o`: `Iterable[base.Issue]`, the issues to be written, can be a generator
+    - `path`: `str`, the filename of the database
+
+    Returns: `int`, the number of issues written
+    """
+    if os.path.exists(path + ".tmp"):
+        os.remove(path + ".tmp")
+    connection = _sqlite_connect(path + ".tmp")
+    try:
+        with connection:
+            count = _sqlite_write(connection, o, replace=False)
+    finally:
+        connection.close()
+    os.replace(path + ".tmp", path)
+    return count
+
+
+def sqlite_update(o: Iterable[base.Issue], path: str) -> int:
+    """Insert or update the issues in a SQLite database, the rows of the other
+    issues are left untouched.
+
+    Parameters:
+
+    - `o`: `Iterable[base.Issue]`, the new or updated issues
+    - `path`: `str`, the filename of the database, created if missing
+
+    Returns: `int`, the number of issues written
+    """
+    connection = _sqlite_connect(path)
+    try:
+        with connection:
+            return _sqlite_write(connection, o)
+    finally:
+        connection.close()
+
+
+def _sqlite_groups(
+    connection: sqlite3.Connection, sql: str, params: Tuple
+) -> Iterator[Tuple[int, List[Tuple]]]:
+    for _id, rows in itertools.groupby(
+        connection.execute(sql, params), key=operator.itemgetter(0)
+    ):
+        yield _id, list(rows)
+
+
+def _sqlite_issues(
+    connection: sqlite3.Connection, _id: int | None = None
+) -> Iterator[base.Issue]:
+    if _id is None:
+        where, params = "", ()
+    else:
+        where, params = "WHERE %s = ?", (_id, )
+    # Every table is read in issue order, and the rows of an issue are
+    # collected while walking through the tables side by side
+    tables = {}
+    for table in ["labels", "messages"] + _SQLITE_NODES:
+        order = "issue_id, field, position" if table == "labels" \
+            else "issue_id, position"
+        tables[table] = _sqlite_groups(
+            connection,
+            "SELECT * FROM %s %s ORDER BY %s" % (
+                table, where and where % ("issue_id", ), order
+            ),
+            params
+        )
+    pending = {_: next(tables[_], None) for _ in tables}
+
+    def rows(table: str, _id: int) -> List[Tuple]:
+        if pending[table] is None or pending[table][0] != _id:
+            return []
+        ret = pending[table][1]
+        pending[table] = next(tables[table], None)
+        return ret
+
+    for row in connection.execute(
+        "SELECT id, %s FROM issues %s ORDER BY id" % (
+            ", ".join(_SQLITE_ATTRIBUTES), where and where % ("id", )
+        ),
+        params
+    ):
+        kwargs = dict(zip(_SQLITE_ATTRIBUTES, row[1:]))
+        for field in const._ISSUE_MULTIPLE_ATTRIBUTES:
+            kwargs[field] = []
+        for _, field, _, value in rows("labels", row[0]):
+            kwargs[field].append(value)
+        kwargs['messages'] = [
+            base.Comment(url=url, author=author, username=username, date=date,
+                         content=content)
+            for _, _, url, author, username, date, content
+            in rows("messages", row[0])
+        ]
+        for table in _SQLITE_NODES:
+            kwargs[table] = [json.loads(_[2]) for _ in rows(table, row[0])]
+        yield base.Issue(_id=row[0], **kwargs)
+
+
+def iter_sqlite(path: str, verbose: bool = True) -> Iterator[base.Issue]:
+    """Lazily load the issues from a SQLite database in ascending ID order
+
+    Parameters:
+
+    - `path`: `str`, the filename of the database
+    - `verbose`: `bool`, whether to print when the database was saved
+
+    Returns: `Iterator[base.Issue]`
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    connection = _sqlite_connect(path)
+    try:
+        if verbose:
+            _print_fetched(dict(connection.execute("SELECT * FROM info")))
+        yield from _sqlite_issues(connection)
+    finally:
+        connection.close()
+
+
+def sqlite_load(path: str, container: type = list) -> Iterable[base.Issue]:
+    return _collect(iter_sqlite(path), container)
+
+
+def sqlite_get_issue(path: str, _id: int) -> base.Issue:
+    """Load a single issue from a SQLite database
+
+    Parameters:
+
+    - `path`: `str`, the filename of the database
+    - `_id`: `int`, the ID of the issue
+
+    Returns: `base.Issue`, raises `KeyError` if the issue is not found
+    """
+    _id = int(_id)
+    if not os.path.exists(path):
+        raise KeyError(_id)
+    connection = _sqlite_connect(path)
+    try:
+        for issue in _sqlite_issues(connection, _id):
+            return issue
+    finally:
+        connection.close()
+    raise KeyError(_id)
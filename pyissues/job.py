@@ -0,0 +1,190 @@
+"""Job module of pyissues package
+
+This module keeps a durable journal of the issues being fetched, so that an
+interrupted `rebuild`, `refetch` or `fix` can be resumed where it stopped.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from . import base
+from . import io as issuesIO
+
+
+class FetchJob():
+    """Journal of a fetch job
+
+    The journal directory holds the IDs to be fetched with the sub-command
+    and the data file they are fetched for (`ids.json`), a log of completed
+    and failed IDs (`journal`), and the fetched issues, which are appended to
+    `issues.xml.gz` with `io.append_issues`. The issues are saved in batches
+    of `batch` issues, and when the job is closed. An issue is marked as
+    completed only after it is saved, so an interrupted job loses at most a
+    batch of issues.
+    """
+
+    def __init__(self, root: str = "job", batch: int = issuesIO.BLOCK_SIZE):
+        self.root = root
+        self.batch = batch
+        self._journal = None
+        self._issues = None
+        self._pending: List[Tuple[int, base.Issue | None]] = []
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def exists(self) -> bool:
+        return os.path.exists(self._path("ids.json"))
+
+    def start(
+        self,
+        ids: Iterable[int],
+        command: str | None = None,
+        target: str | None = None
+    ) -> None:
+        """Discard the previous job and start a new one
+
+        Parameters:
+
+        - `ids`: `Iterable[int]`, the issue IDs to be fetched
+        - `command`: `str` or `None`, the sub-command fetching the issues
+        - `target`: `str` or `None`, the data file the issues are written to
+        """
+        self.finish()
+        os.makedirs(self.root)
+        with open(self._path("ids.json"), "w", encoding="utf-8") as file:
+            json.dump({
+                'command': command,
+                'target': None if target is None else os.path.abspath(target),
+                'ids': sorted(map(int, ids))
+            }, file)
+
+    def _header(self) -> Dict:
+        with open(self._path("ids.json"), "r", encoding="utf-8") as file:
+            ret = json.load(file)
+        # Jobs started before the sub-command and the data file were recorded
+        # only hold the IDs
+        if isinstance(ret, list):
+            ret = {'command': None, 'target': None, 'ids': ret}
+        return ret
+
+    def owner(self) -> Tuple[str | None, str | None]:
+        """The sub-command and the data file of the job, `None` if they were
+        not recorded"""
+        header = self._header()
+        return header['command'], header['target']
+
+    def matches(
+        self,
+        ids: Iterable[int],
+        command: str | None = None,
+        target: str | None = None
+    ) -> bool:
+        """Whether the job can be resumed in place of fetching the issues for
+        the sub-command and the data file: the job was started by the same
+        sub-command for the same data file, it fetches all of the issues, and
+        all of the issues it has not fetched yet are still to be fetched.
+        The issues fetched by a job and already written are not to be fetched
+        again.
+
+        Parameters:
+
+        - `ids`: `Iterable[int]`, the issue IDs to be fetched
+        - `command`: `str` or `None`, the sub-command fetching the issues
+        - `target`: `str` or `None`, the data file the issues are written to
+
+        Returns: `bool`
+        """
+        header = self._header()
+        if header['command'] != command or header['target'] != (
+            None if target is None else os.path.abspath(target)
+        ):
+            return False
+        ids = set(map(int, ids))
+        return ids <= set(header['ids']) and set(self.remaining()) <= ids
+
+    def load(self) -> Tuple[List[int], Set[int], Set[int]]:
+        """Load the state of the job
+
+        Returns: `Tuple[List[int], Set[int], Set[int]]`, the issue IDs to be
+        fetched, the completed IDs and the failed IDs
+        """
+        ids = self._header()['ids']
+        done, failed = set(), set()
+        if os.path.exists(self._path("journal")):
+            with open(self._path("journal"), "r", encoding="utf-8") as file:
+                for line in file:
+                    # The last line may be cut by an interruption
+                    if not line.endswith("\n"):
+                        break
+                    _id = int(line[1:])
+                    if line[0] == "+":
+                        done.add(_id)
+                        failed.discard(_id)
+                    else:
+                        failed.add(_id)
+        return ids, done, failed
+
+    def remaining(self) -> List[int]:
+        """IDs not fetched yet, including the failed ones"""
+        ids, done, _ = self.load()
+        return [_ for _ in ids if _ not in done]
+
+    def record(self, page: int, issue: base.Issue | None) -> None:
+        """Save a fetched issue and mark it as completed, or mark it as failed
+        if `issue` is `None`, once a batch of issues is recorded
+
+        Parameters:
+
+        - `page`: `int`, the issue ID
+        - `issue`: `base.Issue` or `None`, the fetched issue
+        """
+        self._pending.append((page, issue))
+        if len(self._pending) >= self.batch:
+            self.flush()
+
+    def flush(self) -> None:
+        """Save the recorded issues, then mark them in the journal"""
+        if not self._pending:
+            return
+        if self._journal is None:
+            self._issues = open(self._path("issues.xml.gz"), "ab")
+            self._journal = open(self._path("journal"), "a", encoding="utf-8")
+        issuesIO.append_issues(
+            [issue for _, issue in self._pending if issue is not None],
+            self._issues
+        )
+        self._journal.write("".join(
+            "%s%d\n" % ("-" if issue is None else "+", page)
+            for page, issue in self._pending
+        ))
+        self._journal.flush()
+        self._pending = []
+
+    def issues(self) -> Iterator[base.Issue]:
+        """Load the fetched issues in the order they were fetched"""
+        return issuesIO.iter_appended(self._path("issues.xml.gz"))
+
+    def close(self) -> None:
+        """Save the recorded issues and close the journal"""
+        try:
+            self.flush()
+        finally:
+            if self._journal is not None:
+                self._issues.close()
+                self._journal.close()
+                self._issues = self._journal = None
+
+    def failed(self) -> Set[int]:
+        """IDs that failed and were not fetched since"""
+        _, done, failed = self.load()
+        return failed - done
+
+    def finish(self) -> None:
+        """Remove the journal once the fetched issues are written"""
+        self.close()
+        if os.path.exists(self.root):
+            shutil.rmtree(self.root)
@@ -0,0 +1,118 @@
+"""Metadata module of pyissues package
+
+This module keeps the status and the last activity of all issues in a NumPy
+structured array indexed by issue ID, saved as a `.npy` file which is
+memory-mapped when loaded. The status of an issue absent from the list is 0,
+its activity is `NaT`, as is the activity of metadata saved before it was
+recorded.
+
+Metadata saved as JSON, mapping issue ID to status code or to status code
+and last activity, is still read.
+"""
+from __future__ import annotations
+
+import array
+import json
+import os
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+DTYPE = np.dtype([('status', np.uint8), ('activity', 'datetime64[ms]')])
+
+_MAGIC = b"\x93NUMPY"
+
+
+def _activity(_: str) -> str:
+    # The export separates the date and the time with a dot
+    return _.replace(".", "T", 1)
+
+
+def from_rows(rows: Iterable[Sequence[int | str]]) -> np.ndarray:
+    """Build the metadata from the rows of the CSV export
+
+    Parameters:
+
+    - `rows`: `Iterable[Sequence[int | str]]`, issue ID, status code and
+      optionally last activity of every issue, can be a generator
+
+    Returns: `np.ndarray`, see the module documentation
+    """
+    ids = array.array('q')
+    status = bytearray()
+    activity: List[str] = []
+    for row in rows:
+        if not row:
+            continue
+        ids.append(int(row[0]))
+        status.append(int(row[1]))
+        activity.append(_activity(row[2]) if len(row) > 2 and row[2] else "NaT")
+    ids = np.frombuffer(ids, dtype=np.int64)
+    ret = np.zeros(int(ids.max()) + 1 if len(ids) else 0, dtype=DTYPE)
+    ret['activity'] = np.datetime64("NaT")
+    ret['status'][ids] = np.frombuffer(status, dtype=np.uint8)
+    ret['activity'][ids] = np.array(activity, dtype=DTYPE['activity'])
+    return ret
+
+
+def from_dict(o: Dict[int | str, int | List[int | str]]) -> np.ndarray:
+    """Build the metadata from the JSON metadata
+
+    Parameters:
+
+    - `o`: `Dict[int | str, int | List[int | str]]`, issue ID to status code,
+      or to status code and last activity
+
+    Returns: `np.ndarray`, see the module documentation
+    """
+    return from_rows(
+        [_id, *(value if isinstance(value, list) else [value])]
+        for _id, value in o.items()
+    )
+
+
+def load(path: str) -> np.ndarray:
+    """Load the metadata, memory-mapped unless saved as JSON
+
+    Parameters:
+
+    - `path`: `str`, the metadata file
+
+    Returns: `np.ndarray`, see the module documentation
+    """
+    with open(path, "rb") as file:
+        magic = file.read(len(_MAGIC))
+    if magic != _MAGIC:
+        with open(path, "r", encoding="utf-8") as file:
+            return from_dict(json.load(file))
+    ret = np.load(path, mmap_mode="r")
+    if ret.dtype != DTYPE:
+        raise ValueError("Unsupported metadata %s" % (ret.dtype, ))
+    return ret
+
+
+def save(meta: np.ndarray, path: str) -> None:
+    with open(path + ".tmp", "wb") as file:
+        np.save(file, meta)
+    os.replace(path + ".tmp", path)
+
+
+def _resize(meta: np.ndarray, size: int) -> np.ndarray:
+    ret = np.zeros(size, dtype=DTYPE)
+    ret['activity'] = np.datetime64("NaT")
+    ret[:min(size, len(meta))] = meta[:size]
+    return ret
+
+
+def align(old: np.ndarray, new: np.ndarray) -> List[np.ndarray]:
+    """Resize two metadata to the same length, so that they are compared
+    element-wise"""
+    size = max(len(old), len(new))
+    return [
+        _ if len(_) == size else _resize(_, size) for _ in (old, new)
+    ]
+
+
+def ids(mask: np.ndarray) -> List[int]:
+    """IDs of the issues selected by a mask over the metadata"""
+    return np.flatnonzero(mask).tolist()
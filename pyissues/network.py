@@ -1,15 +1,135 @@
 from __future__ import annotations
 
+import asyncio
+import codecs
+import concurrent.futures
 import csv
-import io
-from typing import Callable, Dict, List
+import inspect
+import os
+import queue
+import threading
+from typing import (
+    Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Tuple
+)
 
 import bs4 as bs
+import lxml.etree
+import lxml.html
+import numpy as np
 import requests
 
-from . import base, const, util
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from . import base, cache, const, util
+from . import meta as issuesMeta
 
 parsers: Dict[str, Callable] = {}
+lxml_parsers: Dict[str, Callable] = {}
+
+# Parser used by `parse_doc`, either "lxml" or "bs4", set by the environment
+# variable `PYISSUES_PARSER` so that worker processes inherit it
+PARSER = os.environ.get("PYISSUES_PARSER") or "bs4"
+
+_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+_TR = lxml.etree.XPath(".//tr")
+_TH = lxml.etree.XPath(".//th")
+_TD = lxml.etree.XPath(".//td")
+_TABLE = lxml.etree.XPath("//table[@class]")
+_P = lxml.etree.XPath("//p")
+_STRONG = lxml.etree.XPath(".//strong")
+
+_session: requests.Session | None = None
+_cache: cache.PageCache | None = None
+
+
+def init_session(pool_size: int = 1) -> requests.Session:
+    """Open the keep-alive HTTP session used by the current process, works as
+    the initializer of the fetching pool so that connections are never shared
+    between processes.
+
+    Parameters:
+
+    - `pool_size`: `int`, the number of connections kept alive per host
+
+    Returns: `requests.Session`
+    """
+    global _session
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=pool_size
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    _session = session
+    return session
+
+
+def set_cache(root: str | None = None) -> None:
+    """Select the page cache of the current process, raw pages fetched by
+    `get_data` are saved in it.
+
+    Parameters:
+
+    - `root`: `str` or `None`, the directory of the cache, disabled if empty
+    """
+    global _cache
+    _cache = cache.PageCache(root) if root else None
+
+
+def init_worker(
+    root: str | None = None, pool_size: int = 1, parser: str | None = None
+) -> None:
+    """Initializer of the fetching pool
+
+    Parameters:
+
+    - `root`: `str` or `None`, the directory of the page cache
+    - `pool_size`: `int`, the number of connections kept alive per host
+    - `parser`: `str` or `None`, the `PARSER` of the process, unchanged if
+      `None`
+    """
+    global PARSER
+    init_session(pool_size)
+    set_cache(root)
+    if parser:
+        PARSER = parser
+
+
+def get_session() -> requests.Session:
+    if _session is None:
+        init_session()
+    return _session
+
+
+def session_stats() -> Dict[str, int]:
+    """Statistics of the connection pools of the current process
+
+    Returns: `Dict[str, int]`, the number of `requests` sent, the number of
+    `connections` opened and the number of requests that `reused` a
+    connection
+    """
+    ret = {'requests': 0, 'connections': 0}
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                ret['requests'] += pool.num_requests
+                ret['connections'] += pool.num_connections
+    ret['reused'] = ret['requests'] - ret['connections']
+    return ret
+
+
+def sum_stats(stats: Iterable[Dict[str, int]]) -> Dict[str, int]:
+    """Sum the `session_stats` of several processes"""
+    ret = {'requests': 0, 'connections': 0, 'reused': 0}
+    for _ in stats:
+        for key in ret:
+            ret[key] += _[key]
+    return ret
 
 
 def field_parser(func: Callable) -> Callable:
@@ -17,6 +137,11 @@ def field_parser(func: Callable) -> Callable:
     return func
 
 
+def lxml_field_parser(func: Callable) -> Callable:
+    lxml_parsers[func.__name__[:-len("_lxml")]] = func
+    return func
+
+
 @field_parser
 def form(table: bs.element.Tag, issue: int) -> Dict[str, str]:
     n = [_.find_all("th") for _ in table.find_all('tr')]
@@ -59,7 +184,49 @@ def messages(table: bs.element.Tag, issue: int) -> Dict[str, List[Dict[str, str]
     return {title: ret}
 
 
-def parse_doc(document: str, page: int) -> Dict[str, str]:
+@lxml_field_parser
+def form_lxml(table: lxml.etree._Element, issue: int) -> Dict[str, str]:
+    rows = _TR(table)
+    n = [_TH(_) for _ in rows]
+    m = [_TD(_) for _ in rows]
+    return dict(zip(
+        util.extract_lxml(*n, post=util.replace_space),
+        util.extract_lxml(*m, post=util.format)
+    ))
+
+
+@lxml_field_parser
+def files_lxml(table: lxml.etree._Element, issue: int) -> Dict[str, List[Dict[str, str]]]:
+    ret = []
+    label_iter = iter(_TR(table))
+    title = util.replace_space(util.get_text(next(label_iter).find(".//th")))
+    fields = util.extract_lxml(_TH(next(label_iter)), post=util.replace_space)
+    for record in label_iter:
+        ret.append(dict(zip(fields, util.extract_lxml(
+            _TD(record), post=util.format, links=const._HOME_URL))))
+    return {title: ret}
+
+
+@lxml_field_parser
+def messages_lxml(table: lxml.etree._Element, issue: int) -> Dict[str, List[Dict[str, str]]]:
+    ret = []
+    fields = ['url', 'author', 'date', 'content']
+    label_iter = iter(_TR(table))
+    title = util.replace_space(util.get_text(next(label_iter).find(".//th")))
+    while True:
+        try:
+            meta = util.extract_lxml(_TH(next(label_iter)), post=util.format,
+                                     links=const._ISSUE_URL % (issue, ))
+            meta += util.extract_lxml(_TD(next(label_iter)))
+            newComment = dict(zip(fields, meta))
+            newComment.update(**util.splitAuthor(newComment['author']))
+            ret.append(base.Comment(**newComment))
+        except StopIteration:
+            break
+    return {title: ret}
+
+
+def _parse_doc_bs4(document: str, page: int) -> Dict[str, str]:
     ret = {}
     whole_doc = bs.BeautifulSoup(document, features="lxml")
     for table in whole_doc.find_all('table'):
@@ -74,6 +241,49 @@ def parse_doc(document: str, page: int) -> Dict[str, str]:
             for k, v in zip(const._METAFIELD, result):
                 ret[k] = v.get_text()
             break
+    return ret
+
+
+def _parse_doc_lxml(document: str, page: int) -> Dict[str, str]:
+    ret = {}
+    whole_doc = lxml.html.document_fromstring(
+        document.encode(encoding="utf-8", errors="replace"),
+        parser=_HTML_PARSER
+    )
+    for table in _TABLE(whole_doc):
+        classes = table.get('class').split()
+        if classes and classes[0] in lxml_parsers:
+            ret.update(**lxml_parsers[classes[0]](table, page))
+    for keywd in const._ISSUE_MULTIPLE_ATTRIBUTES:
+        ret[keywd] = ret[keywd].split(", ")
+    for p in _P(whole_doc):
+        result = _STRONG(p)
+        if len(result) in [4, 5]:
+            ret['read_only'] = len(result) == 5
+            for k, v in zip(const._METAFIELD, result):
+                ret[k] = util.get_text(v)
+            break
+    return ret
+
+
+def parse_doc(document: str, page: int, parser: str | None = None) -> Dict[str, str]:
+    """Parse the page of an issue
+
+    Parameters:
+
+    - `document`: `str`, the HTML page
+    - `page`: `int`, the issue ID
+    - `parser`: `str` or `None`, "lxml" to walk the page with `lxml.html` and
+      XPath, "bs4" to walk it with BeautifulSoup, `PARSER` if `None`. Both
+      parsers return the same result on the pages saved in `tests/pages`,
+      see `tests/bench_parser.py` for their speed.
+
+    Returns: `Dict[str, str]`, fields of `base.Issue`
+    """
+    if (parser or PARSER) == "bs4":
+        ret = _parse_doc_bs4(document, page)
+    else:
+        ret = _parse_doc_lxml(document, page)
     for field in const._SPLIT_NEEDED:
         new_names = const._SPLIT_NEEDED[field]
         if field in ret:
@@ -84,24 +294,241 @@ def parse_doc(document: str, page: int) -> Dict[str, str]:
     return ret
 
 
-def get_data(page: int) -> base.Issue:
-    timeout = 10
+def get_data(page: int, parser: str | None = None) -> base.Issue:
     fail = 0
     while True:
         try:
-            resp = requests.get(
-                const._ISSUE_URL % (page, ), timeout=timeout
-            ).content.decode(encoding="utf-8", errors="replace")
-            ret = parse_doc(resp, page)
+            resp = get_page(page).decode(encoding="utf-8", errors="replace")
+            ret = parse_doc(resp, page, parser)
             break
         except KeyboardInterrupt:
             raise KeyboardInterrupt()
+        except Exception as e:
+            fail += 1
+            if fail >= 3:
+                raise e
+            print("Issue %d failed(%d), retrying." % (page, fail))
+            return None
+    ret.update(_id=page)
+    return base.Issue(**ret)
+
+
+def fetch_one(page: int) -> Tuple[int, base.Issue]:
+    """Same as `get_data`, also returns the issue ID so that failed issues can
+    be told apart when the results arrive out of order.
+    """
+    return page, get_data(page)
+
+
+def fetch_one_stats(
+    page: int
+) -> Tuple[int, base.Issue, int, Dict[str, int]]:
+    """Same as `fetch_one`, also returns the process ID and the
+    `session_stats` of the process, so that the parent of a fetching pool
+    can sum the statistics of its workers with `sum_stats`.
+    """
+    page, issue = fetch_one(page)
+    return page, issue, os.getpid(), session_stats()
+
+
+def get_page(page: int) -> bytes:
+    """Download the raw page of an issue, saved in the page cache of the
+    current process if there is one. Timeouts are retried with a longer
+    timeout, up to 60 seconds, an HTTP error status is raised.
+
+    Parameters:
+
+    - `page`: `int`, the issue ID
+
+    Returns: `bytes`
+    """
+    timeout = 10
+    while True:
+        try:
+            response = get_session().get(
+                const._ISSUE_URL % (page, ), timeout=timeout
+            )
+            response.raise_for_status()
+            content = response.content
+            break
         except requests.exceptions.Timeout as e:
             timeout += 5
             if timeout > 60:
                 raise e
             print("Request for issue %d timeout, wait for %d seconds." %
                   (page, timeout))
+    if _cache is not None:
+        _cache.put(page, content)
+    return content
+
+
+def parse_page(
+    page: int, content: bytes, parser: str | None = None
+) -> base.Issue:
+    """Parse the raw page of an issue
+
+    Parameters:
+
+    - `page`: `int`, the issue ID
+    - `content`: `bytes`, the raw page
+    - `parser`: `str` or `None`, see `parse_doc`
+
+    Returns: `base.Issue`, or `None` if the issue failed to be parsed
+    """
+    try:
+        ret = parse_doc(
+            content.decode(encoding="utf-8", errors="replace"), page, parser
+        )
+    except KeyboardInterrupt:
+        raise KeyboardInterrupt()
+    except Exception:
+        print("Issue %d failed to be parsed." % (page, ))
+        return None
+    ret.update(_id=page)
+    return base.Issue(**ret)
+
+
+def fetch_pipeline(
+    pages: Iterable[int],
+    io_workers: int = 32,
+    cpu_workers: int | None = None,
+    backlog: int | None = None,
+    parser: str | None = None
+) -> Iterator[Tuple[int, base.Issue]]:
+    """Fetch the issues in two stages: a thread pool downloads the raw pages
+    and a process pool parses them.
+
+    The downloaded pages wait in a queue of `backlog` pages, downloading
+    threads block when the queue is full until the parsing processes catch up.
+
+    Parameters:
+
+    - `pages`: `Iterable[int]`, the issue IDs
+    - `io_workers`: `int`, the number of downloading threads
+    - `cpu_workers`: `int` or `None`, the number of parsing processes, the
+      number of CPUs if `None`
+    - `backlog`: `int` or `None`, the number of pages waiting to be parsed,
+      4 pages per parsing process if `None`
+    - `parser`: `str` or `None`, see `parse_doc`
+
+    Returns: `Iterator[Tuple[int, base.Issue]]`, the issue ID and the issue in
+    the order the issues are parsed, the issue is `None` if it failed to be
+    downloaded or parsed
+    """
+    pages = list(map(int, pages))
+    cpu_workers = cpu_workers or os.cpu_count() or 1
+    backlog = backlog or cpu_workers * 4
+    downloaded: queue.Queue = queue.Queue(maxsize=backlog)
+    pending, lock = iter(pages), threading.Lock()
+    init_session(io_workers)
+
+    def download() -> None:
+        while True:
+            with lock:
+                page = next(pending, None)
+            if page is None:
+                break
+            try:
+                content = get_page(page)
+            except Exception:
+                print("Issue %d failed to be downloaded." % (page, ))
+                content = None
+            downloaded.put((page, content))
+
+    for _ in range(io_workers):
+        threading.Thread(target=download, daemon=True).start()
+
+    # Maps the parsing tasks to their issue IDs
+    remaining, in_flight = len(pages), {}
+    with concurrent.futures.ProcessPoolExecutor(cpu_workers) as pool:
+        while remaining or in_flight:
+            if remaining and len(in_flight) < backlog:
+                page, content = downloaded.get()
+                remaining -= 1
+                if content is None:
+                    yield page, None
+                else:
+                    task = pool.submit(parse_page, page, content, parser)
+                    in_flight[task] = page
+                done = {_ for _ in in_flight if _.done()}
+            else:
+                done, _ = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+            for _ in done:
+                yield in_flight.pop(_), _.result()
+
+
+def parse_cached(page: int, parser: str | None = None) -> base.Issue:
+    """Parse an issue from the page cache of the current process
+
+    Parameters:
+
+    - `page`: `int`, the issue ID
+    - `parser`: `str` or `None`, see `parse_doc`
+
+    Returns: `base.Issue`, or `None` if the issue failed to be parsed
+    """
+    try:
+        resp = _cache.get(page).decode(encoding="utf-8", errors="replace")
+        ret = parse_doc(resp, page, parser)
+    except KeyboardInterrupt:
+        raise KeyboardInterrupt()
+    except Exception:
+        print("Issue %d failed to be parsed." % (page, ))
+        return None
+    ret.update(_id=page)
+    return base.Issue(**ret)
+
+
+async def async_get_data(
+    page: int,
+    session: aiohttp.ClientSession | None = None,
+    parser: str | None = None
+) -> base.Issue:
+    """Fetch and parse an issue without blocking the event loop, with the same
+    retry policy as `get_data`.
+
+    Parameters:
+
+    - `page`: `int`, the issue ID
+    - `session`: `aiohttp.ClientSession` or `None`, a temporary session is
+      opened if `None`
+    - `parser`: `str` or `None`, see `parse_doc`
+
+    Returns: `base.Issue`, or `None` if the issue failed to be parsed
+    """
+    if aiohttp is None:
+        raise ImportError("aiohttp is required to fetch issues asynchronously")
+    if session is None:
+        async with aiohttp.ClientSession() as session:
+            return await async_get_data(page, session, parser)
+    timeout = 10
+    fail = 0
+    while True:
+        try:
+            async with session.get(
+                const._ISSUE_URL % (page, ),
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as resp:
+                resp.raise_for_status()
+                content = await resp.read()
+            if _cache is not None:
+                _cache.put(page, content)
+            # Parsing is CPU-bound, it runs in the default executor so that
+            # the other requests are not held
+            ret = await asyncio.get_running_loop().run_in_executor(
+                None, parse_doc,
+                content.decode(encoding="utf-8", errors="replace"),
+                page, parser
+            )
+            break
+        except asyncio.TimeoutError as e:
+            timeout += 5
+            if timeout > 60:
+                raise e
+            print("Request for issue %d timeout, wait for %d seconds." %
+                  (page, timeout))
         except Exception as e:
             fail += 1
             if fail >= 3:
@@ -112,11 +539,148 @@ def get_data(page: int) -> base.Issue:
     return base.Issue(**ret)
 
 
-async def async_get_data(page: int) -> base.Issue:
-    return get_data(page)
+async def fetch_many_async(
+    pages: Iterable[int],
+    concurrency: int = 100,
+    parser: str | None = None,
+    callback: Callable[[int, base.Issue], Awaitable[None] | None] | None = None
+) -> List[base.Issue] | None:
+    """Fetch the issues concurrently in a single event loop
+
+    Parameters:
+
+    - `pages`: `Iterable[int]`, the issue IDs
+    - `concurrency`: `int`, the maximum number of requests in flight
+    - `parser`: `str` or `None`, see `parse_doc`
+    - `callback`: `Callable` or `None`, called with the issue ID and the issue
+      as soon as each issue is fetched, awaited if it returns an awaitable, so
+      that a full consumer holds the workers back. The issues are not kept if
+      it is given.
+
+    Returns: `List[base.Issue]`, in the same order as `pages`, failed issues
+    are `None`, or `None` if `callback` is given
+    """
+    if aiohttp is None:
+        raise ImportError("aiohttp is required to fetch issues asynchronously")
+    if callback is None:
+        pages = list(map(int, pages))
+        pending = iter(pages)
+    else:
+        pending = map(int, pages)
+    ret: Dict[int, base.Issue] = {}
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        for page in pending:
+            issue = await async_get_data(page, session, parser)
+            if callback is None:
+                ret[page] = issue
+                continue
+            waiting = callback(page, issue)
+            if inspect.isawaitable(waiting):
+                await waiting
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        workers = [
+            asyncio.ensure_future(worker(session)) for _ in range(concurrency)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for _ in workers:
+                _.cancel()
+    if callback is not None:
+        return None
+    return [ret[_] for _ in pages]
+
+
+def iter_many_async(
+    pages: Iterable[int],
+    concurrency: int = 100,
+    backlog: int = 1000,
+    parser: str | None = None
+) -> Iterator[Tuple[int, base.Issue]]:
+    """Run `fetch_many_async` in a background thread and yield the issues as
+    soon as they are fetched
+
+    The issues are passed through an `asyncio.Queue`, the workers wait on the
+    event loop when `backlog` issues are not consumed yet. The fetch is
+    cancelled if the iterator is closed before it is exhausted.
+
+    Parameters:
+
+    - `pages`: `Iterable[int]`, the issue IDs
+    - `concurrency`: `int`, the maximum number of requests in flight
+    - `backlog`: `int`, the number of fetched issues waiting to be consumed
+    - `parser`: `str` or `None`, see `parse_doc`
+
+    Returns: `Iterator[Tuple[int, base.Issue]]`, the issue ID and the issue,
+    which is `None` if the issue failed
+    """
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    state: Dict[str, Any] = {}
+    done = object()
+
+    async def produce() -> None:
+        fetched = state['queue'] = asyncio.Queue(maxsize=backlog)
+        state['task'] = asyncio.current_task()
+        started.set()
+        try:
+            await fetch_many_async(
+                pages, concurrency,
+                callback=lambda page, issue: fetched.put((page, issue)),
+                parser=parser
+            )
+        except Exception as e:
+            state['error'] = e
+        await fetched.put(done)
+        # The loop keeps running until the consumer has drained the queue, the
+        # consumer cancels the task when it is done
+        await asyncio.get_running_loop().create_future()
+
+    def run() -> None:
+        try:
+            loop.run_until_complete(produce())
+        except BaseException as e:
+            state.setdefault('error', e)
+        finally:
+            started.set()
+            loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait()
+    try:
+        while 'queue' in state:
+            item = asyncio.run_coroutine_threadsafe(
+                state['queue'].get(), loop
+            ).result()
+            if item is done:
+                break
+            yield item
+    finally:
+        if 'task' in state:
+            try:
+                loop.call_soon_threadsafe(state['task'].cancel)
+            except RuntimeError:
+                # The loop is closed already
+                pass
+        thread.join()
+    error = state.get('error')
+    if error is not None and not isinstance(error, asyncio.CancelledError):
+        raise error
+
 
+def get_list() -> np.ndarray:
+    """Fetch the status and the time of the last activity of all issues, the
+    CSV export is parsed as it is downloaded
 
-def get_list() -> Dict[int, int]:
-    issue_list = csv.reader(io.StringIO(requests.get(const._ISSUE_LIST).content.decode()[:-1]))
-    next(issue_list)
-    return {int(x): int(y) for x, y in issue_list}
+    Returns: `np.ndarray`, see `pyissues.meta`
+    """
+    with get_session().get(const._ISSUE_LIST, stream=True) as response:
+        issue_list = csv.reader(
+            codecs.iterdecode(response.iter_lines(), "utf-8")
+        )
+        next(issue_list)
+        return issuesMeta.from_rows(issue_list)
@@ -0,0 +1,268 @@
+"""Query module of pyissues package
+
+This module keeps an index of the fields of the issues beside the data file,
+so that the issues matching conditions on their fields are found with set
+operations instead of loading the data file.
+
+The conditions are written as `field=value`, joined by spaces, and an issue
+matches if it meets all of them. Available operators:
+
+* `field=a,b`    the field is (or, for multiple attributes, holds) `a` or `b`
+* `field!=a,b`   the field is not (or does not hold) `a` nor `b`
+* `date>=d`      also `>`, `<=` and `<` for `created` and `last_changed`, `d`
+                 is a prefix of `YYYY-mm-dd HH:MM`, so that `created<=2020`
+                 covers the whole year
+
+Singular names such as `component`, `version`, `keyword` and `nosy` can be
+used for the multiple attributes. Values holding spaces are quoted, e.g.
+`component="Library (Lib)"`.
+"""
+from __future__ import annotations
+
+import array
+import bisect
+import contextlib
+import os
+import pickle
+import re
+import shlex
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+from . import base, const, util
+
+FIELDS = sorted(
+    (const._ISSUE_ATTRIBUTES | const._ISSUE_MULTIPLE_ATTRIBUTES) -
+    set(const._TIME_FIELDS) - {'_id', 'title'}
+)
+ALIASES = {
+    'component': 'components',
+    'version': 'versions',
+    'keyword': 'keywords',
+    'nosy': 'nosy_list',
+    'id': '_id'
+}
+
+_FORMAT_VERSION = 1
+_CONDITION = re.compile(r"^(\w+)\s*(!=|>=|<=|=|>|<)(.*)$", re.DOTALL)
+
+
+def index_path(path: str) -> str:
+    """Location of the field index of a data file"""
+    return path.rstrip("/" + os.sep) + ".query"
+
+
+def _array(ids: Iterable[int]) -> array.array:
+    return array.array('l', sorted(ids))
+
+
+def _contains(ids: array.array, _id: int) -> bool:
+    i = bisect.bisect_left(ids, _id)
+    return i < len(ids) and ids[i] == _id
+
+
+def parse(text: str) -> List[Tuple[str, str, List[str]]]:
+    """Parse the conditions of a query
+
+    Parameters:
+
+    - `text`: `str`, the query, see the module documentation
+
+    Returns: `List[Tuple[str, str, List[str]]]`, field, operator and values of
+    every condition, raises `ValueError` if a condition is malformed
+    """
+    ret = []
+    for condition in shlex.split(text):
+        match = _CONDITION.match(condition)
+        if match is None:
+            raise ValueError("Malformed condition %r" % (condition, ))
+        field, operator, value = match.groups()
+        field = ALIASES.get(field, field)
+        if field in const._TIME_FIELDS:
+            if operator in ("=", "!="):
+                raise ValueError("Use a range for %s" % (field, ))
+            ret.append((field, operator, [value]))
+        elif field in FIELDS or field == '_id':
+            if operator not in ("=", "!="):
+                raise ValueError("%s only supports = and !=" % (field, ))
+            ret.append((field, operator, value.split(",")))
+        else:
+            raise ValueError("Unknown field %r" % (field, ))
+    return ret
+
+
+class QueryIndex():
+    """Index of the fields of the issues
+
+    Every value of the fields in `FIELDS` maps to the sorted array of IDs of
+    the issues holding it. Every field in `const._TIME_FIELDS` keeps the times
+    of all of the issues in ascending order with the IDs in the same order,
+    so that a range of times is found by bisection. The index is saved as a
+    pickle file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.clear()
+
+    def clear(self) -> None:
+        self.ids = array.array('l')
+        self.values: Dict[str, Dict[str, array.array]] = {
+            _: {} for _ in FIELDS
+        }
+        self.times: Dict[str, Tuple[List[str], array.array]] = {
+            _: ([], array.array('l')) for _ in const._TIME_FIELDS
+        }
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> QueryIndex:
+        with open(self.path, "rb") as file:
+            data = pickle.load(file)
+        if data['version'] != _FORMAT_VERSION:
+            raise ValueError("Unsupported index version %s" % (data['version'], ))
+        self.ids, self.values, self.times = \
+            data['ids'], data['values'], data['times']
+        return self
+
+    def save(self) -> None:
+        data = {
+            'version': _FORMAT_VERSION,
+            'ids': self.ids,
+            'values': self.values,
+            'times': self.times
+        }
+        with open(self.path + ".tmp", "wb") as file:
+            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + ".tmp", self.path)
+
+    def update(self, o: Iterable[base.Issue], replace: bool = False) -> int:
+        """Add the issues to the index, replacing their previous versions
+
+        Parameters:
+
+        - `o`: `Iterable[base.Issue]`, the issues to be indexed
+        - `replace`: `bool`, whether to drop the issues indexed before
+
+        Returns: `int`, the number of issues indexed
+        """
+        values: Dict[str, Dict[str, Set[int]]] = {_: {} for _ in FIELDS}
+        times: Dict[str, List[Tuple[str, int]]] = {
+            _: [] for _ in const._TIME_FIELDS
+        }
+        ids = set()
+        for issue in o:
+            _id = int(issue._id)
+            ids.add(_id)
+            for field in FIELDS:
+                value = getattr(issue, field, "")
+                for _ in (value if isinstance(value, list) else [value]):
+                    values[field].setdefault(_ or "", set()).add(_id)
+            for field in const._TIME_FIELDS:
+                times[field].append((getattr(issue, field, ""), _id))
+        if replace:
+            self.clear()
+        elif ids:
+            self._remove(ids)
+        self.ids = _array(ids.union(self.ids))
+        for field in FIELDS:
+            for value, new in values[field].items():
+                old = self.values[field].get(value, ())
+                self.values[field][value] = _array(new.union(old))
+        for field in const._TIME_FIELDS:
+            old = zip(*self.times[field])
+            merged = sorted(times[field] + list(old))
+            self.times[field] = (
+                [_[0] for _ in merged], array.array('l', [_[1] for _ in merged])
+            )
+        return len(ids)
+
+    def _remove(self, ids: Set[int]) -> None:
+        for field in FIELDS:
+            for value, old in list(self.values[field].items()):
+                if any(_contains(old, _) for _ in ids):
+                    kept = [_ for _ in old if _ not in ids]
+                    if kept:
+                        self.values[field][value] = array.array('l', kept)
+                    else:
+                        del self.values[field][value]
+        for field in const._TIME_FIELDS:
+            keys, order = self.times[field]
+            kept = [(k, _) for k, _ in zip(keys, order) if _ not in ids]
+            self.times[field] = (
+                [_[0] for _ in kept], array.array('l', [_[1] for _ in kept])
+            )
+
+    def feed(
+        self, o: Iterable[base.Issue], replace: bool = False
+    ) -> Iterable[base.Issue]:
+        """Index the issues as they are taken from the returned iterable, the
+        index is saved once all of the issues are taken.
+
+        Parameters:
+
+        - `o`: `Iterable[base.Issue]`, the issues to be indexed, can be a
+          generator
+        - `replace`: `bool`, whether to drop the issues indexed before
+
+        Returns: `Iterable[base.Issue]`, the same issues, sized if `o` is
+        """
+        return util.feed(o, lambda: self._writer(replace))
+
+    @contextlib.contextmanager
+    def _writer(self, replace: bool) -> Iterator[Callable[[base.Issue], None]]:
+        if not replace and self.exists():
+            self.load()
+        # Only the indexed fields are kept until the index is updated
+        issues = []
+        yield lambda issue: issues.append(base.Issue(**{
+            _: getattr(issue, _, "")
+            for _ in FIELDS + const._TIME_FIELDS + ['_id']
+        }))
+        self.update(issues, replace)
+        self.save()
+
+    def _match(self, field: str, values: List[str]) -> Set[int]:
+        if field == '_id':
+            return {
+                int(_) for _ in values if _.isdigit() and _contains(self.ids, int(_))
+            }
+        ret = set()
+        for value in values:
+            ret.update(self.values[field].get(value, ()))
+        return ret
+
+    def _range(self, field: str, operator: str, value: str) -> Set[int]:
+        keys, order = self.times[field]
+        # A time is within `<=` or out of `>` if its prefix is the value
+        if operator == ">=":
+            return set(order[bisect.bisect_left(keys, value):])
+        elif operator == ">":
+            return set(order[bisect.bisect_left(keys, value + "\uffff"):])
+        elif operator == "<=":
+            return set(order[:bisect.bisect_left(keys, value + "\uffff")])
+        return set(order[:bisect.bisect_left(keys, value)])
+
+    def select(self, text: str) -> List[int]:
+        """Find the issues matching all of the conditions of a query
+
+        Parameters:
+
+        - `text`: `str`, the query, see the module documentation
+
+        Returns: `List[int]`, the matching issue IDs in ascending order
+        """
+        ret = None
+        excluded = set()
+        for field, operator, values in parse(text):
+            if field in const._TIME_FIELDS:
+                found = self._range(field, operator, values[0])
+            elif operator == "!=":
+                excluded |= self._match(field, values)
+                continue
+            else:
+                found = self._match(field, values)
+            ret = found if ret is None else ret & found
+        if ret is None:
+            ret = set(self.ids)
+        return sorted(ret - excluded)
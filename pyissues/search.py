@@ -0,0 +1,247 @@
+"""Search module of pyissues package
+
+This module keeps an inverted index over the titles and messages of the
+issues in a SQLite database beside the data file, and ranks the issues
+matching a query with BM25.
+"""
+from __future__ import annotations
+
+import contextlib
+import heapq
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from . import base, util
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# A token in the title counts as many tokens in the messages
+TITLE_WEIGHT = 3
+
+_TOKEN = re.compile(r"\w+")
+_MAX_TOKEN = 40
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value INTEGER);
+CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, length INTEGER);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL, issue_id INTEGER NOT NULL, tf INTEGER NOT NULL,
+    PRIMARY KEY (term, issue_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_issue ON postings (issue_id);
+"""
+
+
+def index_path(path: str) -> str:
+    """Location of the search index of a data file"""
+    return path.rstrip("/" + os.sep) + ".search"
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        _ for _ in _TOKEN.findall(text.lower()) if len(_) <= _MAX_TOKEN
+    ]
+
+
+def _terms(issue: base.Issue) -> Counter:
+    ret = Counter()
+    for _ in range(TITLE_WEIGHT):
+        ret.update(tokenize(issue.title))
+    for message in issue.messages:
+        ret.update(tokenize(message.content))
+    return ret
+
+
+class SearchIndex():
+    """Inverted index over the titles and messages of the issues
+
+    Table `postings` holds the frequency of every term in every issue, table
+    `docs` the number of terms of every issue. The number of issues and the
+    total number of terms are kept in table `info`, so that a query only reads
+    the postings of its own terms. Table `info` also marks the index as
+    complete once it has been built from all of the issues.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        """Whether the index has been built, an index whose building was
+        interrupted or never committed is not"""
+        if not os.path.exists(self.path):
+            return False
+        connection = sqlite3.connect(self.path)
+        try:
+            return connection.execute(
+                "SELECT value FROM info WHERE key = 'complete'"
+            ).fetchone() is not None
+        except sqlite3.DatabaseError:
+            return False
+        finally:
+            connection.close()
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def clear(self, connection: sqlite3.Connection) -> None:
+        for table in ("info", "docs", "postings"):
+            connection.execute("DELETE FROM %s" % (table, ))
+
+    def _info(self, connection: sqlite3.Connection) -> Dict[str, int]:
+        ret = {'docs': 0, 'length': 0}
+        ret.update(connection.execute("SELECT * FROM info"))
+        return ret
+
+    def add(self, connection: sqlite3.Connection, issue: base.Issue) -> None:
+        """Index an issue, replacing the previous version of it"""
+        _id = int(issue._id)
+        info = self._info(connection)
+        old = connection.execute(
+            "SELECT length FROM docs WHERE id = ?", (_id, )
+        ).fetchone()
+        if old is not None:
+            connection.execute("DELETE FROM postings WHERE issue_id = ?", (_id, ))
+            info['docs'] -= 1
+            info['length'] -= old[0]
+        terms = _terms(issue)
+        length = sum(terms.values())
+        connection.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?)",
+            [(term, _id, tf) for term, tf in terms.items()]
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO docs VALUES (?, ?)", (_id, length)
+        )
+        info['docs'] += 1
+        info['length'] += length
+        connection.executemany(
+            "INSERT OR REPLACE INTO info VALUES (?, ?)", info.items()
+        )
+
+    def feed(
+        self, o: Iterable[base.Issue], replace: bool = False
+    ) -> Iterable[base.Issue]:
+        """Index the issues as they are taken from the returned iterable
+
+        The index is committed once all of the issues are taken, and left
+        unchanged if the iteration stops early. If `replace` is true, the
+        index is marked as complete when it is committed, see `exists`.
+
+        Parameters:
+
+        - `o`: `Iterable[base.Issue]`, the issues to be indexed, can be a
+          generator
+        - `replace`: `bool`, whether to drop the issues indexed before
+
+        Returns: `Iterable[base.Issue]`, the same issues, sized if `o` is
+        """
+        return util.feed(o, lambda: self._writer(replace))
+
+    @contextlib.contextmanager
+    def _writer(self, replace: bool) -> Iterator[Callable[[base.Issue], None]]:
+        connection = self.connect()
+        try:
+            with connection:
+                if replace:
+                    self.clear(connection)
+                yield lambda issue: self.add(connection, issue)
+                if replace:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO info VALUES ('complete', 1)"
+                    )
+        finally:
+            connection.close()
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Rank the issues matching any term of the query with BM25
+
+        Parameters:
+
+        - `query`: `str`, the query
+        - `limit`: `int`, the maximum number of results
+
+        Returns: `List[Tuple[int, float]]`, issue IDs and scores, the best
+        match first
+        """
+        connection = self.connect()
+        try:
+            info = self._info(connection)
+            if not info['docs']:
+                return []
+            average = info['length'] / info['docs']
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = connection.execute(
+                    "SELECT postings.issue_id, postings.tf, docs.length "
+                    "FROM postings JOIN docs ON docs.id = postings.issue_id "
+                    "WHERE postings.term = ?", (term, )
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(
+                    1 + (info['docs'] - len(postings) + 0.5) /
+                    (len(postings) + 0.5)
+                )
+                for _id, tf, length in postings:
+                    scores[_id] = scores.get(_id, 0) + idf * tf * (K1 + 1) / (
+                        tf + K1 * (1 - B + B * length / average)
+                    )
+        finally:
+            connection.close()
+        return heapq.nlargest(
+            limit, scores.items(), key=lambda _: (_[1], -_[0])
+        )
+
+    def count(self, query: str) -> int:
+        """The number of issues matching any term of the query, the results of
+        `search` without limit
+
+        Parameters:
+
+        - `query`: `str`, the query
+
+        Returns: `int`
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return 0
+        connection = self.connect()
+        try:
+            return connection.execute(
+                "SELECT COUNT(DISTINCT issue_id) FROM postings "
+                "WHERE term IN (%s)" % (", ".join("?" * len(terms)), ), terms
+            ).fetchone()[0]
+        finally:
+            connection.close()
+
+
+def snippet(issue: base.Issue, query: str, width: int = 80) -> str:
+    """The passage of the title or messages holding the most terms of the
+    query
+
+    Parameters:
+
+    - `issue`: `base.Issue`, the issue
+    - `query`: `str`, the query
+    - `width`: `int`, the length of the passage
+
+    Returns: `str`, the beginning of the title if no term is found
+    """
+    terms = set(tokenize(query))
+    best, found = None, 0
+    for text in [issue.title] + [_.content for _ in issue.messages]:
+        matches = [_ for _ in _TOKEN.finditer(text) if _[0].lower() in terms]
+        distinct = len({_[0].lower() for _ in matches})
+        if distinct > found:
+            best, found = (text, matches[0].start()), distinct
+    if best is None:
+        return " ".join(issue.title[:width].split())
+    text, position = best
+    start = max(0, position - width // 3)
+    return ("..." if start else "") + " ".join(text[start:start + width].split())
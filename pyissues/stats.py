@@ -0,0 +1,209 @@
+"""Statistics module of pyissues package
+
+This module extracts the times and categorical fields of the issues into NumPy
+arrays, cached in a `.npz` file beside the data file, and aggregates them by
+periods of `const._TIME_UNITS` and by any categorical field.
+
+The archive does not keep when an issue was closed, so the last change of a
+closed issue is taken as its closing time.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Callable, Dict, Iterable, List
+
+import numpy as np
+
+from . import base, const
+from . import io as issuesIO
+
+CLOSED = ['closed']
+# NumPy units of the keys of `const._TIME_UNITS`
+_UNITS = {
+    'year': 'Y', 'month': 'M', 'day': 'D', 'hour': 'h', 'minute': 'm',
+    'second': 's'
+}
+_CATEGORICAL = sorted(const._ISSUE_CATEGORICAL)
+_TIME = 'datetime64[m]'
+
+
+def cache_path(path: str) -> str:
+    """Location of the cached columns of a data file"""
+    return path.rstrip("/" + os.sep) + ".npz"
+
+
+def _sources(path: str) -> np.ndarray:
+    """Size and modification time of the files the columns are extracted from"""
+    if os.path.isdir(path):
+        files = [os.path.join(path, issuesIO.MANIFEST)]
+    else:
+        files = [path, issuesIO.delta_path(path)]
+    ret = []
+    for _ in files:
+        if os.path.exists(_):
+            stat = os.stat(_)
+            ret.append([stat.st_size, stat.st_mtime_ns])
+    return np.array(ret, dtype=np.int64).reshape(-1, 2)
+
+
+def extract(o: Iterable[base.Issue]) -> Dict[str, np.ndarray]:
+    """Extract the columns of the issues
+
+    Returns: `Dict[str, np.ndarray]`, `id`, the times in
+    `const._TIME_FIELDS`, and for every field in `const._ISSUE_CATEGORICAL`
+    the codes of the values with the values in `<field>.values`. The codes of
+    multiple attributes are flattened, the codes of issue `i` are in
+    `codes[offsets[i]:offsets[i + 1]]` with the offsets in `<field>.offsets`.
+    """
+    ids = []
+    times = {_: [] for _ in const._TIME_FIELDS}
+    codes = {_: [] for _ in _CATEGORICAL}
+    offsets = {_: [0] for _ in const._ISSUE_MULTIPLE_ATTRIBUTES}
+    values: Dict[str, Dict[str, int]] = {_: {} for _ in _CATEGORICAL}
+    for issue in o:
+        ids.append(int(issue._id))
+        for field in const._TIME_FIELDS:
+            times[field].append(getattr(issue, field, "") or "NaT")
+        for field in _CATEGORICAL:
+            value = getattr(issue, field, "")
+            mapping = values[field]
+            if field in const._ISSUE_MULTIPLE_ATTRIBUTES:
+                for _ in value:
+                    codes[field].append(mapping.setdefault(_ or "", len(mapping)))
+                offsets[field].append(len(codes[field]))
+            else:
+                codes[field].append(mapping.setdefault(value or "", len(mapping)))
+    ret = {'id': np.array(ids, dtype=np.int64)}
+    for field in const._TIME_FIELDS:
+        ret[field] = np.array(times[field], dtype=_TIME)
+    for field in _CATEGORICAL:
+        ret[field] = np.array(codes[field], dtype=np.int32)
+        ret[field + ".values"] = np.array(list(values[field]), dtype=str)
+        if field in offsets:
+            ret[field + ".offsets"] = np.array(offsets[field], dtype=np.int64)
+    return ret
+
+
+def load(
+    path: str, loader: Callable[[], Iterable[base.Issue]]
+) -> Dict[str, np.ndarray]:
+    """Load the cached columns of a data file, the columns are extracted again
+    if the data file changed since they were cached.
+
+    Parameters:
+
+    - `path`: `str`, the data file
+    - `loader`: `Callable[[], Iterable[base.Issue]]`, called to load the
+      issues if the cache is stale
+
+    Returns: `Dict[str, np.ndarray]`, see `extract`
+    """
+    sources = _sources(path)
+    try:
+        with np.load(cache_path(path)) as file:
+            columns = dict(file)
+        if np.array_equal(columns.pop('sources'), sources):
+            return columns
+    except (OSError, KeyError, ValueError):
+        pass
+    columns = extract(loader())
+    with open(cache_path(path) + ".tmp", "wb") as file:
+        np.savez(file, sources=sources, **columns)
+    os.replace(cache_path(path) + ".tmp", cache_path(path))
+    return columns
+
+
+def _bucket(times: np.ndarray, unit: str) -> np.ndarray:
+    return times.astype('datetime64[%s]' % (_UNITS[unit], ))
+
+
+def _label(bucket: np.datetime64, unit: str) -> str:
+    return bucket.astype('datetime64[s]').item().strftime(const._TIME_UNITS[unit])
+
+
+def summarize(
+    columns: Dict[str, np.ndarray], unit: str = "year", by: str | None = None
+) -> List[Dict[str, Any]]:
+    """Aggregate the issues by period and category
+
+    Every row holds the number of issues created in the period (`created`),
+    the number of them still open (`open`), the number of issues closed in the
+    period (`closed`), and the median and 90th percentile of the days taken to
+    close the issues created in the period (`median_days`, `p90_days`). An
+    issue with a multiple attribute is counted in each of its values.
+
+    Parameters:
+
+    - `columns`: `Dict[str, np.ndarray]`, see `extract`
+    - `unit`: `str`, a key of `const._TIME_UNITS`
+    - `by`: `str` or `None`, a field in `const._ISSUE_CATEGORICAL`
+
+    Returns: `List[Dict[str, Any]]`, rows sorted by period and category
+    """
+    if unit not in _UNITS:
+        raise ValueError("Unknown unit %r" % (unit, ))
+    if by is not None and by not in const._ISSUE_CATEGORICAL:
+        raise ValueError("Unknown categorical field %r" % (by, ))
+    n = len(columns['id'])
+    if by is None:
+        rows, categories, labels = np.arange(n), np.zeros(n, np.int64), [""]
+    elif by in const._ISSUE_MULTIPLE_ATTRIBUTES:
+        offsets = columns[by + ".offsets"]
+        rows = np.repeat(np.arange(n), np.diff(offsets))
+        categories, labels = columns[by], columns[by + ".values"]
+    else:
+        rows, categories, labels = np.arange(n), columns[by], columns[by + ".values"]
+    status = columns['status.values']
+    closed = np.isin(columns['status'], np.flatnonzero(np.isin(status, CLOSED)))
+    closed = closed[rows]
+    created = _bucket(columns['created'], unit)[rows]
+    changed = _bucket(columns['last_changed'], unit)[rows]
+    has_created = ~np.isnat(created)
+    has_closed = closed & ~np.isnat(changed)
+
+    buckets = np.unique(np.concatenate(
+        [created[has_created], changed[has_closed]]
+    ))
+    width = len(labels)
+    size = len(buckets) * width
+
+    def keys(times: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        return np.searchsorted(buckets, times[mask]) * width + categories[mask]
+
+    created_keys = keys(created, has_created)
+    opened = np.bincount(created_keys, minlength=size)
+    still_open = np.bincount(keys(created, has_created & ~closed), minlength=size)
+    closed_count = np.bincount(keys(changed, has_closed), minlength=size)
+
+    # Days taken to close, grouped by the period of creation
+    done = has_created & has_closed
+    days = (
+        columns['last_changed'][rows][done] - columns['created'][rows][done]
+    ).astype(np.float64) / 1440
+    done_keys = keys(created, done)
+    order = np.argsort(done_keys, kind="stable")
+    done_keys, days = done_keys[order], days[order]
+    bounds = np.flatnonzero(np.diff(done_keys)) + 1
+    percentiles = {}
+    for start, stop in zip(
+        np.concatenate([[0], bounds]), np.concatenate([bounds, [len(days)]])
+    ):
+        if stop > start:
+            percentiles[int(done_keys[start])] = np.percentile(
+                days[start:stop], [50, 90]
+            )
+
+    ret = []
+    for key in np.flatnonzero(opened + closed_count):
+        bucket, category = divmod(int(key), width)
+        median, p90 = percentiles.get(int(key), (np.nan, np.nan))
+        ret.append({
+            'period': _label(buckets[bucket], unit),
+            'category': str(labels[category]),
+            'created': int(opened[key]),
+            'open': int(still_open[key]),
+            'closed': int(closed_count[key]),
+            'median_days': float(median),
+            'p90_days': float(p90)
+        })
+    return ret
@@ -2,18 +2,58 @@ from __future__ import annotations
 
 import operator
 import re
-from typing import Dict, List, Mapping, Optional
+from collections import abc
+from typing import (
+    Callable, ContextManager, Dict, Iterable, Iterator, List, Mapping, Optional
+)
+
+import lxml.etree
 
 from . import const
 
 stripper = operator.methodcaller("strip")
 
+# Same strings as `bs4.element.Tag.get_text`, which skips scripts and styles
+_TEXT = lxml.etree.XPath(".//text()[not(ancestor::script or ancestor::style)]")
+
 
 def MappingIterWrapper(o: Mapping):
     for _ in o:
         yield o[_]
 
 
+class Feed():
+    """Iterable passing the items of `o` through, every item is handed to the
+    callable returned by `writer()` before being yielded. The context manager
+    is exited once all of the items are taken, or with `GeneratorExit` if the
+    iteration stops early.
+    """
+
+    def __init__(self, o: Iterable, writer: Callable[[], ContextManager[Callable]]):
+        self.o = o
+        self.writer = writer
+
+    def __iter__(self) -> Iterator:
+        items_iter = MappingIterWrapper(self.o) \
+            if isinstance(self.o, Mapping) else self.o
+        with self.writer() as add:
+            for item in items_iter:
+                add(item)
+                yield item
+
+
+class SizedFeed(Feed):
+    def __len__(self) -> int:
+        return len(self.o)
+
+
+def feed(o: Iterable, writer: Callable[[], ContextManager[Callable]]) -> Feed:
+    """Wrap `o` in a `Feed`, which is sized if `o` is"""
+    if isinstance(o, abc.Sized):
+        return SizedFeed(o, writer)
+    return Feed(o, writer)
+
+
 def replace_space(o: str) -> str:
     return re.sub("\(.*?\)", "", o).lower().strip().replace(" ", "_")
 
@@ -72,3 +112,28 @@ def extract(*args, post=None, links: Optional[str] = None) -> List[str]:
 
     ret = map(stripper, ret)
     return list(ret if post is None else map(post, ret))
+
+
+def get_text(o: lxml.etree._Element) -> str:
+    return "".join(_TEXT(o))
+
+
+def extract_lxml(*args, post=None, links: Optional[str] = None) -> List[str]:
+    """Same as `extract`, for cells parsed by `lxml.html`"""
+    ret = []
+    for o in args:
+        for _ in o:
+            anchor = None if links is None else _.find(".//a")
+            if anchor is None:
+                value = get_text(_).strip()
+                value = re.sub(":$", "", value)
+                ret.append(value)
+            elif isinstance(links, str):
+                url = anchor.attrib['href']
+                if url and 'http' not in url:
+                    # Issue 10932 will receive empty urls.
+                    url = url_join(links, url)
+                ret.append(url)
+
+    ret = map(stripper, ret)
+    return list(ret if post is None else map(post, ret))
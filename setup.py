@@ -16,5 +16,6 @@ if __name__ == "__main__":
         packages=find_packages(),
         platforms=["all"],
         url='',
-        install_requires=['requests', 'beautifulsoup4']
+        install_requires=['requests', 'beautifulsoup4', 'numpy'],
+        extras_require={'async': ['aiohttp']}
     )
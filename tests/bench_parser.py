@@ -0,0 +1,35 @@
+"""Time the `lxml` and `bs4` parsers of `pyissues.network` on the saved pages
+
+Usage: python tests/bench_parser.py [rounds]
+"""
+import glob
+import os
+import re
+import sys
+import timeit
+
+from pyissues import network
+
+
+def main(rounds: int = 20) -> None:
+    pages = []
+    root = os.path.join(os.path.dirname(__file__), "pages")
+    for path in sorted(glob.glob(os.path.join(root, "*.html"))):
+        page = int(re.findall(r"\d+", os.path.basename(path))[0])
+        with open(path, "r", encoding="utf-8") as file:
+            pages.append((page, file.read()))
+    for parser in ("bs4", "lxml"):
+        elapsed = min(timeit.repeat(
+            lambda: [
+                network.parse_doc(document, page, parser=parser)
+                for page, document in pages
+            ],
+            number=rounds, repeat=3
+        ))
+        print("%-5s %8.2f ms per page" % (
+            parser, elapsed / rounds / len(pages) * 1000
+        ))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
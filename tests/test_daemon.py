@@ -0,0 +1,97 @@
+"""Requests answered by the daemon of `pyissues.daemon`"""
+import io
+import os
+import pickle
+import threading
+import time
+
+import pytest
+
+from pyissues import base, daemon
+
+
+@pytest.fixture
+def server(tmp_path):
+    issues = {_: base.Issue(_id=_, title="Issue %d" % (_, )) for _ in (1, 2)}
+    return daemon.Daemon(str(tmp_path / "issues.xml.gz"), lambda: issues)
+
+
+def test_get(server):
+    success, ret = server._handle(("get", ([2, 3], )))
+    assert success
+    assert ret[0].title == "Issue 2" and ret[1] is None
+
+
+def test_search_count(server):
+    success, ret = server._handle(("search", ("issue", 1)))
+    assert success and len(ret) == 1
+    assert server._handle(("count", ("issue", ))) == (True, 2)
+
+
+@pytest.mark.parametrize("name", [
+    "serve", "_refresh", "_handle", "loader", "__init__", "issues", "index"
+])
+def test_unknown_request(server, name):
+    success, ret = server._handle((name, ()))
+    assert not success
+    assert isinstance(ret, ValueError)
+
+
+class _Payload():
+    # Runs `os.remove` on the path if it is ever unpickled
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return os.remove, (self.path, )
+
+
+def _frame(o):
+    data = pickle.dumps(o, protocol=pickle.HIGHEST_PROTOCOL)
+    return io.BytesIO(daemon._HEADER.pack(len(data)) + data)
+
+
+def test_request_values():
+    request = ("get", ([1, 2], None, "text", 1.5, True))
+    assert daemon._receive(_frame(request), request=True) == request
+
+
+@pytest.mark.parametrize("request_", [
+    lambda path: ("get", (_Payload(path), )),
+    lambda path: _Payload(path),
+    lambda path: ("get", ({_Payload(path)}, )),
+])
+def test_request_globals(tmp_path, request_):
+    path = tmp_path / "kept"
+    path.touch()
+    with pytest.raises(pickle.UnpicklingError):
+        daemon._receive(_frame(request_(str(path))), request=True)
+    assert path.exists()
+
+
+@pytest.mark.parametrize("request_", ["get", ("get", ), ("get", [1]), None])
+def test_malformed_request(server, request_):
+    success, ret = server._handle(request_)
+    assert not success
+    assert isinstance(ret, ValueError)
+
+
+@pytest.mark.skipif(not daemon.supported(), reason="no Unix domain sockets")
+def test_serve_rejects_globals(tmp_path):
+    path = tmp_path / "kept"
+    path.touch()
+    issues = {1: base.Issue(_id=1, title="Issue 1")}
+    datafile = str(tmp_path / "issues.xml.gz")
+    server = daemon.Daemon(datafile, lambda: issues)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if os.path.exists(daemon.socket_path(datafile)):
+            break
+        time.sleep(0.05)
+    client = daemon.connect(datafile)
+    with pytest.raises(ValueError):
+        client.call("get", _Payload(str(path)))
+    assert path.exists()
+    # The daemon keeps answering after the rejected request
+    assert client.get([1])[0].title == "Issue 1"
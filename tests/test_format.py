@@ -0,0 +1,70 @@
+"""The format versions of the archives of `pyissues.io`
+
+Version 2 escapes the characters XML cannot hold, see `base._FORBIDDEN`, with
+the private use character U+E000 followed by the code point. Version 1 encodes
+every text with base64 and is still read.
+"""
+import pytest
+
+from pyissues import base, io
+
+TEXTS = [
+    "plain text",
+    "tab\tnew line\ncarriage return\r\nend",
+    "null\x00 bell\x07 escape\x1b unit separator\x1f",
+    "mark \ue000 and escaped-looking \ue0000041 text",
+    "lone surrogates \ud800 and \udfff",
+    "non-characters \ufffe\uffff",
+]
+
+
+def _issues(texts):
+    return [
+        base.Issue(
+            _id=_id, title=text, status="open",
+            files=[{'file_name': text, 'description': text}],
+            messages=[base.Comment(
+                url="msg%d" % (_id, ), author="Guido van Rossum", content=text,
+                date="2010-03-01 18:00", username="gvanrossum"
+            )]
+        )
+        for _id, text in enumerate(texts, 1)
+    ]
+
+
+def _texts(issues):
+    return [
+        (_.title, _.files[0]['file_name'], _.files[0]['description'],
+         _.messages[0].content)
+        for _ in issues
+    ]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("name", ["issues.xml", "issues.xml.gz"])
+def test_escape_round_trip(tmp_path, name, lazy):
+    path = str(tmp_path / name)
+    assert io.stream_dump(_issues(TEXTS), path) == len(TEXTS)
+    loaded = list(io.iter_issues(path, lazy=lazy))
+    assert _texts(loaded) == [(_, _, _, _) for _ in TEXTS]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_escape(text):
+    escaped = base.Issue._escape(text)
+    assert base.Issue._unescape(escaped) == text
+    assert not base._FORBIDDEN.search(escaped.replace(base._ESCAPE_MARK, ""))
+
+
+def test_version_1(tmp_path):
+    # Lone surrogates cannot be encoded in UTF-8, so version 1 never held them
+    texts = [_ for _ in TEXTS if "surrogates" not in _]
+    path = str(tmp_path / "issues.xml.gz")
+    io.stream_dump(_issues(texts), path, version=1)
+    assert io.load_index(path)['version'] == 1
+    assert _texts(io.iter_issues(path)) == [(_, _, _, _) for _ in texts]
+    assert _texts([io.get_issue(path, 3)]) == [(texts[2], ) * 4]
+    # The issues are written in the current version once upgraded
+    io.stream_dump(io.iter_issues(path, lazy=True), path)
+    assert io.load_index(path)['version'] == base.FORMAT_VERSION
+    assert _texts(io.iter_issues(path)) == [(_, _, _, _) for _ in texts]
@@ -0,0 +1,108 @@
+"""The delta log of the compressed archives of `pyissues.io`
+
+Updates to a compressed archive are appended to its delta log, the latest
+version of an issue in the log takes precedence over the archive until the log
+is compacted into the archive.
+"""
+import hashlib
+import os
+
+import pytest
+
+import pyissues.__main__ as cli
+from pyissues import base, io
+
+
+def _issue(_id, title=None):
+    # Content that barely compresses, so that the sizes grow with the issues
+    content = " ".join(
+        hashlib.sha256(b"%d-%d" % (_id, _)).hexdigest() for _ in range(8)
+    )
+    return base.Issue(
+        _id=_id, title=title or "Issue %d" % (_id, ), status="open",
+        messages=[base.Comment(
+            url="msg%d" % (_id, ), author="Guido van Rossum", content=content,
+            date="2010-03-01 18:00", username="gvanrossum"
+        )]
+    )
+
+
+def _titles(issues):
+    return {int(_._id): _.title for _ in issues}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = str(tmp_path / "issues.xml.gz")
+    io.stream_dump((_issue(_) for _ in range(1, 201)), path)
+    return path
+
+
+def test_delta_overrides_archive(archive):
+    io.append_delta([_issue(3, "First"), _issue(5, "First")], archive)
+    io.append_delta([_issue(5, "Second"), _issue(300, "New")], archive)
+    assert [(int(_._id), _.title) for _ in io.iter_delta(archive)] == [
+        (3, "First"), (5, "First"), (5, "Second"), (300, "New")
+    ]
+    expected = {_: "Issue %d" % (_, ) for _ in range(1, 201)}
+    expected.update({3: "First", 5: "Second", 300: "New"})
+    merged = list(io.iter_merged(archive))
+    assert [int(_._id) for _ in merged] == sorted(expected)
+    assert _titles(merged) == expected
+    assert _titles(io.parallel_load(archive, processes=2)) == expected
+    # The archive itself is left untouched
+    assert _titles(io.iter_issues(archive))[5] == "Issue 5"
+
+
+def test_get_issue_prefers_delta(archive):
+    io.append_delta([_issue(5, "First")], archive)
+    io.append_delta([_issue(5, "Second"), _issue(300, "New")], archive)
+    assert io.get_issue(archive, 5).title == "Second"
+    assert io.get_issue(archive, 300).title == "New"
+    assert io.get_issue(archive, 6).title == "Issue 6"
+    with pytest.raises(KeyError):
+        io.get_issue(archive, 301)
+
+
+def test_truncated_delta(archive):
+    io.append_delta([_issue(5, "First")], archive)
+    io.append_delta([_issue(6, "First")], archive)
+    path = io.delta_path(archive)
+    with open(path, "r+b") as file:
+        file.truncate(os.path.getsize(path) - 10)
+    # The member cut by an interrupted write is ignored
+    assert _titles(io.iter_delta(archive)) == {5: "First"}
+
+
+def test_compaction_ratio(archive):
+    assert not io.needs_compaction(archive)
+    size, _id = os.path.getsize(archive), 0
+    while not io.needs_compaction(archive):
+        # Compaction is only needed once the log is over a quarter of the
+        # archive
+        if _id:
+            assert os.path.getsize(io.delta_path(archive)) <= size * 0.25
+        _id += 1
+        io.append_delta([_issue(_id, "Updated")], archive)
+    assert os.path.getsize(io.delta_path(archive)) > size * 0.25
+    assert _id > 1
+    assert io.compact(archive) == 200
+    assert not os.path.exists(io.delta_path(archive))
+    assert not io.needs_compaction(archive)
+    titles = _titles(io.iter_issues(archive))
+    assert all(titles[_] == "Updated" for _ in range(1, _id + 1))
+    assert titles[_id + 1] == "Issue %d" % (_id + 1, )
+    assert io.get_issue(archive, 1).title == "Updated"
+
+
+def test_merge_compacts(archive):
+    updated = [_issue(_, "Updated") for _ in range(1, 101)]
+    assert cli.merge(updated[:10], archive) == 10
+    assert os.path.exists(io.delta_path(archive))
+    assert not io.needs_compaction(archive)
+    cli.merge(updated[10:], archive)
+    # The log went over the ratio and was folded into the archive
+    assert not os.path.exists(io.delta_path(archive))
+    titles = _titles(io.iter_issues(archive))
+    assert [titles[_] for _ in range(1, 102)] == \
+        ["Updated"] * 100 + ["Issue 101"]
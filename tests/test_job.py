@@ -0,0 +1,80 @@
+"""Journal of the fetch jobs of `pyissues.job`"""
+import json
+
+from pyissues import base, job
+
+
+def _issue(_id):
+    return base.Issue(_id=_id, title="Issue %d" % (_id, ))
+
+
+def test_matches(tmp_path):
+    fetch = job.FetchJob(str(tmp_path / "job"))
+    fetch.start([3, 1, 2], "refetch", "issues.xml.gz")
+    assert fetch.matches({1, 2, 3}, "refetch", "issues.xml.gz")
+    assert not fetch.matches({1, 2}, "refetch", "issues.xml.gz")
+    assert not fetch.matches({1, 2, 3}, "fix", "issues.xml.gz")
+    assert not fetch.matches({1, 2, 3}, "refetch", "other.xml.gz")
+
+
+def test_legacy(tmp_path):
+    fetch = job.FetchJob(str(tmp_path / "job"))
+    fetch.start([1, 2])
+    (tmp_path / "job" / "ids.json").write_text(json.dumps([1, 2]))
+    assert fetch.owner() == (None, None)
+    assert fetch.remaining() == [1, 2]
+    assert not fetch.matches([1, 2], "refetch", "issues.xml.gz")
+
+
+def test_batches(tmp_path):
+    fetch = job.FetchJob(str(tmp_path / "job"), batch=4)
+    fetch.start(range(1, 11), "refetch", "issues.xml.gz")
+    for _ in range(1, 7):
+        fetch.record(_, None if _ == 5 else _issue(_))
+    # Only the first batch is saved until the job is closed
+    assert fetch.load()[1] == {1, 2, 3, 4}
+    assert [int(_._id) for _ in fetch.issues()] == [1, 2, 3, 4]
+    fetch.close()
+    ids, done, failed = fetch.load()
+    assert (done, failed) == ({1, 2, 3, 4, 6}, {5})
+    assert fetch.remaining() == [5, 7, 8, 9, 10]
+    assert [int(_._id) for _ in fetch.issues()] == [1, 2, 3, 4, 6]
+
+
+def test_resume_failed(tmp_path, monkeypatch):
+    import pyissues.__main__ as cli
+    from pyissues import network
+
+    monkeypatch.chdir(tmp_path)
+    failing = {3}
+
+    def fetched(records, concurrency, parser=None):
+        for _ in records:
+            yield _, None if _ in failing else _issue(_)
+
+    monkeypatch.setattr(network, "iter_many_async", fetched)
+    issues = cli.fetch(range(1, 6), 1, "async", "",
+                       command="refetch", target="issues.xml.gz")
+    assert sorted(int(_._id) for _ in issues) == [1, 2, 4, 5]
+    # The journal is kept for the failed issue
+    assert not cli.finish_job()
+    assert job.FetchJob().remaining() == [3]
+
+    failing.clear()
+    issues = cli.fetch(range(1, 6), 1, "async", "", resume=True,
+                       command="refetch", target="issues.xml.gz")
+    assert sorted(int(_._id) for _ in issues) == [1, 2, 3, 4, 5]
+    assert cli.finish_job()
+    assert not job.FetchJob().exists()
+
+
+def test_resume_failed_subset(tmp_path, monkeypatch):
+    # `fix` only asks for the issues not written yet when it is resumed
+    fetch = job.FetchJob(str(tmp_path / "job"))
+    fetch.start([1, 2, 3], "fix", "issues.xml.gz")
+    fetch.record(1, _issue(1))
+    fetch.record(2, None)
+    fetch.close()
+    assert fetch.matches([2, 3], "fix", "issues.xml.gz")
+    assert not fetch.matches([3], "fix", "issues.xml.gz")
+    assert not fetch.matches([2, 3, 4], "fix", "issues.xml.gz")
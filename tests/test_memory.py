@@ -0,0 +1,98 @@
+"""Memory used by the issues of `pyissues.base`
+
+The categorical fields, see `const._ISSUE_CATEGORICAL` and
+`const._COMMENT_CATEGORICAL`, are interned, so that a value shared by many
+issues or comments is kept once.
+"""
+import sys
+import tracemalloc
+
+from pyissues import base, const, io
+
+N = 10000
+
+
+def _author():
+    # A new string object at every call
+    return "".join(["Guido", " van Rossum"])
+
+
+def _comments():
+    return [
+        base.Comment(
+            url="msg%d" % (_, ), author=_author(), content="",
+            date="2010-03-01 18:00", username="".join(["gvan", "rossum"])
+        )
+        for _ in range(N)
+    ]
+
+
+def test_comment_fields_interned():
+    comments = _comments()
+    for key in const._COMMENT_CATEGORICAL:
+        assert getattr(comments[0], key) is getattr(comments[-1], key)
+
+
+def test_comment_memory():
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        comments = _comments()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    # The comments and their URLs, the authors and the user names are not
+    # copied for every comment
+    expected = N * (
+        sys.getsizeof(comments[0]) + sys.getsizeof(comments[0].url) + 8
+    )
+    assert used < expected + N * sys.getsizeof(_author()) / 2
+
+
+def _archive(path, n=300, m=20):
+    io.xmldumpCompressed((
+        base.Issue(
+            _id=_, title="Issue %d" % (_, ), status="open", type="behavior",
+            nosy_list=["alice", "bob"], messages=[
+                base.Comment(
+                    url="msg%d" % (_ * m + i, ), author="Guido van Rossum",
+                    content="", date="2010-03-01 18:00", username="gvanrossum"
+                )
+                for i in range(m)
+            ]
+        )
+        for _ in range(1, n + 1)
+    ), path)
+
+
+def _load(path):
+    tracemalloc.start()
+    try:
+        issues = list(io.iter_issues(path))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return issues, peak
+
+
+def test_load_memory(tmp_path, monkeypatch):
+    path = str(tmp_path / "issues.xml.gz")
+    _archive(path)
+    issues, peak = _load(path)
+    comments = [_ for issue in issues for _ in issue.messages]
+    for key in const._COMMENT_CATEGORICAL:
+        assert len({id(getattr(_, key)) for _ in comments}) == 1
+    # The same archive loaded without interning
+    monkeypatch.setattr(base, "_intern", lambda o: o)
+    del issues, comments
+    baseline = _load(path)[1]
+    assert peak < baseline * 0.85
+
+
+def test_issue_fields_interned():
+    issues = [
+        base.Issue(_id=_, status="".join(["op", "en"]), nosy_list=["a" + "b"])
+        for _ in range(2)
+    ]
+    assert issues[0].status is issues[1].status
+    assert issues[0].nosy_list[0] is issues[1].nosy_list[0]
@@ -0,0 +1,48 @@
+"""Change detection over the metadata of `pyissues.meta`"""
+import numpy as np
+
+import pyissues.__main__ as cli
+from pyissues import meta
+
+
+def _meta(n=20):
+    return meta.from_rows(
+        (_, 1 if _ % 3 else 2, "2022-04-%02d.10:00:00" % (_ % 28 + 1))
+        for _ in range(1, n + 1)
+    )
+
+
+def test_changed():
+    new = _meta()
+    old = np.array(new)
+    old['activity'][5] = np.datetime64("2020-01-01")
+    assert cli.compare_meta(old, new, fullupdate=False) == {5}
+
+
+def test_missing_activity():
+    # A row without old activity is selected unless it was closed, the other
+    # rows are still compared
+    new = _meta()
+    old = np.array(new)
+    old['activity'][3] = np.datetime64("NaT")
+    old['activity'][4] = np.datetime64("NaT")
+    old['activity'][5] = np.datetime64("2020-01-01")
+    assert cli.compare_meta(old, new, fullupdate=False) == {4, 5}
+    new['activity'][7] = np.datetime64("NaT")
+    assert cli.compare_meta(old, new, fullupdate=False) == {4, 5, 7}
+
+
+def test_migrated():
+    # After the migration from the JSON metadata, no activity is known
+    new = _meta()
+    old = np.array(new)
+    old['activity'] = np.datetime64("NaT")
+    assert cli.compare_meta(old, new, fullupdate=False) == {
+        _ for _ in range(1, 21) if _ % 3
+    }
+
+
+def test_added():
+    new = _meta(22)
+    old = meta.align(_meta(), new)[0]
+    assert cli.compare_meta(old, new, fullupdate=False) == {21, 22}
@@ -0,0 +1,148 @@
+"""The asynchronous fetch of `pyissues.network` against a local server
+
+The server answers with the pages saved in `tests/pages`.
+"""
+import asyncio
+import glob
+import os
+import re
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from pyissues import const, network
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "pages")
+PAGES = {
+    int(re.findall(r"\d+", os.path.basename(_))[0]): _
+    for _ in glob.glob(os.path.join(ROOT, "*.html"))
+}
+
+
+async def _issue(request):
+    page = int(request.match_info['page'])
+    if page not in PAGES:
+        raise web.HTTPNotFound()
+    with open(PAGES[page], "rb") as file:
+        return web.Response(body=file.read(), content_type="text/html")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_get(r"/issue{page:\d+}", _issue)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = runner.addresses[0][1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        const, "_ISSUE_URL", "http://127.0.0.1:%d/issue%%d" % (port, )
+    )
+    monkeypatch.setattr(network, "_cache", None)
+    yield sorted(PAGES)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.run_until_complete(runner.cleanup())
+    loop.close()
+
+
+def _title(page):
+    with open(PAGES[page], "r", encoding="utf-8") as file:
+        return network.parse_doc(file.read(), page)['title']
+
+
+def test_fetch_many_async(server):
+    issues = asyncio.run(network.fetch_many_async(server, concurrency=2))
+    assert [int(_._id) for _ in issues] == server
+    assert [_.title for _ in issues] == [_title(_) for _ in server]
+
+
+def test_fetch_many_async_callback(server):
+    fetched = []
+
+    async def callback(page, issue):
+        fetched.append((page, issue.title))
+
+    assert asyncio.run(network.fetch_many_async(
+        server, concurrency=2, callback=callback
+    )) is None
+    assert sorted(fetched) == [(_, _title(_)) for _ in server]
+
+
+def test_iter_many_async(server):
+    fetched = network.iter_many_async(server * 3, concurrency=4, backlog=1)
+    assert sorted(page for page, _ in fetched) == sorted(server * 3)
+
+
+def test_iter_many_async_close(server):
+    fetched = network.iter_many_async(server * 50, concurrency=4, backlog=1)
+    page, issue = next(fetched)
+    assert int(issue._id) == page
+    fetched.close()
+
+
+@pytest.mark.parametrize("engine", ["process", "async", "pipeline"])
+def test_engines_report_failures(server, engine):
+    # Issue 3 is not served
+    pages = server + [3]
+    if engine == "process":
+        network.init_worker()
+        fetched = [network.fetch_one(_) for _ in pages]
+    elif engine == "async":
+        fetched = list(network.iter_many_async(pages, concurrency=2))
+    else:
+        fetched = list(network.fetch_pipeline(pages, 2, 2))
+    assert sorted(page for page, _ in fetched) == sorted(pages)
+    assert {page for page, issue in fetched if issue is None} == {3}
+    for page, issue in fetched:
+        if issue is not None:
+            assert int(issue._id) == page
+
+
+def test_get_page_status(server):
+    network.init_session()
+    with pytest.raises(network.requests.HTTPError):
+        network.get_page(3)
+    assert network.get_data(3) is None
+
+
+@pytest.mark.parametrize("engine", ["process", "async", "pipeline"])
+def test_engines_parser(server, monkeypatch, engine):
+    # The pages only parse with the selected parser, the worker processes are
+    # forked with the patched module
+    def failing(document, page):
+        raise ValueError(page)
+
+    titles = [(_, _title(_)) for _ in server]
+    monkeypatch.setattr(network, "_parse_doc_bs4", failing)
+    if engine == "process":
+        monkeypatch.setattr(network, "PARSER", network.PARSER)
+        network.init_worker(None, 1, "lxml")
+        fetched = [network.fetch_one(_) for _ in server]
+    elif engine == "async":
+        fetched = list(network.iter_many_async(
+            server, concurrency=2, parser="lxml"
+        ))
+    else:
+        fetched = list(network.fetch_pipeline(server, 2, 2, parser="lxml"))
+    assert sorted((page, issue.title) for page, issue in fetched) == titles
+
+
+def test_parser_environment():
+    process = subprocess.run(
+        [sys.executable, "-c", "from pyissues import network; "
+         "print(network.PARSER)"],
+        env=dict(os.environ, PYISSUES_PARSER="lxml",
+                 PYTHONPATH=os.path.dirname(os.path.dirname(ROOT))),
+        capture_output=True, text=True, check=True
+    )
+    assert process.stdout.strip() == "lxml"
@@ -0,0 +1,50 @@
+"""The `lxml` and `bs4` parsers of `pyissues.network` against saved pages
+
+The pages in `tests/pages` are named after the issue ID, they cover the
+whitespace, `<br>` and entities found in the cells and the messages.
+"""
+import glob
+import os
+import re
+
+import pytest
+
+from pyissues import base, network
+
+ROOT = os.path.join(os.path.dirname(__file__), "pages")
+PAGES = sorted(glob.glob(os.path.join(ROOT, "*.html")))
+
+
+def _fields(o):
+    if isinstance(o, base.Comment):
+        return {_: getattr(o, _) for _ in o.__slots__ if _ != '_raw'}
+    if isinstance(o, dict):
+        return {key: _fields(value) for key, value in o.items()}
+    if isinstance(o, list):
+        return [_fields(_) for _ in o]
+    return o
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return int(re.findall(r"\d+", os.path.basename(path))[0]), file.read()
+
+
+@pytest.mark.parametrize("path", PAGES, ids=os.path.basename)
+def test_parsers_agree(path):
+    page, document = _read(path)
+    expected = _fields(network.parse_doc(document, page, parser="bs4"))
+    actual = _fields(network.parse_doc(document, page, parser="lxml"))
+    assert actual.keys() == expected.keys()
+    for key in expected:
+        assert actual[key] == expected[key], key
+
+
+def test_entities_and_breaks():
+    page, document = _read(os.path.join(ROOT, "issue42.html"))
+    for parser in ("bs4", "lxml"):
+        ret = network.parse_doc(document, page, parser=parser)
+        assert ret['title'] == "Crash\xa0in\tmodule 42<thing>\xa0&— caféstuff: yes"
+        assert ret['messages'][0].content.startswith(
+            "leading\xa0spaces&amp; 'quoted'"
+        )
@@ -0,0 +1,67 @@
+"""Completeness of the search index of `pyissues.search`"""
+import glob
+import os
+import re
+
+from pyissues import base, network, search
+
+ROOT = os.path.join(os.path.dirname(__file__), "pages")
+
+
+def _issues():
+    for path in sorted(glob.glob(os.path.join(ROOT, "*.html"))):
+        page = int(re.findall(r"\d+", os.path.basename(path))[0])
+        with open(path, "r", encoding="utf-8") as file:
+            ret = network.parse_doc(file.read(), page)
+        yield base.Issue(_id=page, **ret)
+
+
+def test_interrupted_feed(tmp_path):
+    index = search.SearchIndex(str(tmp_path / "issues.xml.gz.search"))
+    assert not index.exists()
+    fed = iter(index.feed(_issues(), replace=True))
+    next(fed)
+    fed.close()
+    assert not index.exists()
+    for _ in index.feed(_issues(), replace=True):
+        pass
+    assert index.exists()
+    assert index.search("crash")
+
+
+def test_merge_keeps_complete(tmp_path):
+    index = search.SearchIndex(str(tmp_path / "issues.xml.gz.search"))
+    for _ in index.feed(_issues(), replace=True):
+        pass
+    for _ in index.feed(list(_issues())[:1]):
+        pass
+    assert index.exists()
+
+
+def test_not_an_index(tmp_path):
+    path = tmp_path / "issues.xml.gz.search"
+    path.write_text("not a database")
+    assert not search.SearchIndex(str(path)).exists()
+
+
+def test_count(tmp_path):
+    index = search.SearchIndex(str(tmp_path / "issues.xml.gz.search"))
+    for _ in index.feed(_issues(), replace=True):
+        pass
+    for query in ("crash", "python crash", "simple message", "nothingmatches", ""):
+        assert index.count(query) == len(index.search(query, 1000))
+    assert index.count("module") > 1
+
+
+def test_search_command(tmp_path, capsys):
+    import pyissues.__main__ as cli
+
+    path = str(tmp_path / "issues.xml.gz")
+    cli.write(_issues(), path)
+    capsys.readouterr()
+    index = search.SearchIndex(search.index_path(path))
+    total = index.count("module")
+    assert len(cli.search(datafile=path, query="module", limit="1")) == 1
+    output = capsys.readouterr().out.splitlines()
+    assert output[0].startswith("%d results in " % (total, ))
+    assert output[-1] == "... and %d more." % (total - 1, )
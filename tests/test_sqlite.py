@@ -0,0 +1,61 @@
+"""The SQLite backend of `pyissues.io` against the saved pages
+
+The issues parsed from `tests/pages` are dumped, loaded back and upserted,
+their fields are compared after every step.
+"""
+import glob
+import os
+import re
+
+import pytest
+
+from pyissues import base, const, io, network
+
+ROOT = os.path.join(os.path.dirname(__file__), "pages")
+
+
+def _issues():
+    ret = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "*.html"))):
+        page = int(re.findall(r"\d+", os.path.basename(path))[0])
+        with open(path, "r", encoding="utf-8") as file:
+            fields = network.parse_doc(file.read(), page)
+        fields.update(_id=page)
+        ret.append(base.Issue(**fields))
+    return sorted(ret, key=lambda _: int(_._id))
+
+
+def _fields(issue):
+    # The fields the archives save, `read_only` is not saved
+    ret = {_: getattr(issue, _) for _ in const._ISSUE_FIELD}
+    ret['messages'] = [_.asdict() for _ in ret['messages']]
+    return ret
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "issues.sqlite")
+    issues = _issues()
+    assert io.sqlite_dump(iter(issues), path) == len(issues)
+    loaded = io.sqlite_load(path)
+    assert [_fields(_) for _ in loaded] == [_fields(_) for _ in issues]
+    for issue in issues:
+        assert _fields(io.sqlite_get_issue(path, issue._id)) == _fields(issue)
+
+
+def test_update(tmp_path):
+    path = str(tmp_path / "issues.sqlite")
+    issues = _issues()
+    io.sqlite_dump(issues[:-1], path)
+    changed = _issues()[0]
+    changed.title = "Changed title"
+    changed.messages = changed.messages[:1]
+    changed.nosy_list = ["alice"]
+    assert io.sqlite_update([changed, issues[-1]], path) == 2
+    expected = [changed] + issues[1:]
+    assert [_fields(_) for _ in io.sqlite_load(path)] == \
+        [_fields(_) for _ in expected]
+    # Updating again with the same issue is idempotent
+    io.sqlite_update([changed], path)
+    assert _fields(io.sqlite_get_issue(path, changed._id)) == _fields(changed)
+    with pytest.raises(KeyError):
+        io.sqlite_get_issue(path, 0)
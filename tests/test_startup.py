@@ -0,0 +1,53 @@
+"""Import time of the command line of `pyissues`
+
+The sub-commands import the modules they use on first use, see
+`pyissues.lazy_import`, so that a quick sub-command does not import the
+network stack or NumPy.
+"""
+import os
+import subprocess
+import sys
+
+import pyissues
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = {'aiohttp', 'bs4', 'lxml', 'numpy', 'requests'}
+# Standard modules only some sub-commands use
+STANDARD = {'multiprocessing', 'sqlite3'}
+
+
+def _imported(tmp_path, *args):
+    env = dict(os.environ, HOME=str(tmp_path), PYTHONPATH=ROOT)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        env=env, capture_output=True, text=True, check=True
+    )
+    # Every line of -X importtime ends with the name of the module, indented
+    # by its depth
+    return {
+        line.rsplit("|", 1)[-1].strip().split(".")[0]
+        for line in process.stderr.splitlines() if line.startswith("import time:")
+    }
+
+
+def test_version(tmp_path):
+    imported = _imported(tmp_path, "-m", "pyissues", "version")
+    assert not imported & (HEAVY | STANDARD)
+
+
+def test_io(tmp_path):
+    assert not _imported(tmp_path, "-c", "import pyissues.io") & STANDARD
+
+
+def test_daemon_client(tmp_path):
+    imported = _imported(
+        tmp_path, "-c", "import pyissues.daemon; "
+        "pyissues.daemon.connect('issues.xml.gz')"
+    )
+    assert not imported & HEAVY
+
+
+def test_lazy_import():
+    meta = pyissues.lazy_import(".meta")
+    assert meta.DTYPE.names == ('status', 'activity')
+    assert pyissues.lazy_import("pyissues.meta") is meta